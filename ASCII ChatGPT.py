@@ -1,20 +1,771 @@
-import importlib
-import subprocess
+import time
+
+# When the script started, for reporting how long startup takes
+START_TIME = time.perf_counter()
+
+import importlib.util
 import os
+import sys
+import argparse
+import shutil
+import json
+import random
+import gzip
+import html
+import io
+import tempfile
+from collections import OrderedDict
 
-# A list of required packages
-required_packages = ["pyfiglet", "random"]
 
-# Check if all required packages are installed, and install them if they are not
-for package in required_packages:
-    try:
-        importlib.import_module(package)
-    except ImportError:
-        print(f"Package {package} not found. Installing...")
-        subprocess.check_call(["pip", "install", package])
+# A function to import a module that only actually loads the first time one of its attributes is used
+def lazy_import(name):
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        print(f"Package {name} not found. Install it with: pip install {name}")
+        sys.exit(1)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+# pyfiglet takes longer to import than the rest of the script, so it is only loaded once something is rendered
+pyfiglet = lazy_import("pyfiglet")
+
+# Times one block of code and records it when the block ends
+class Timer:
+    __slots__ = ("instrumentation", "category", "font", "start")
+
+    def __init__(self, instrumentation, category, font):
+        self.instrumentation = instrumentation
+        self.category = category
+        self.font = font
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.instrumentation.record(self.category, time.perf_counter() - self.start, self.font)
+        return False
+
+
+# Stands in for a Timer when instrumentation is off, so timed blocks cost next to nothing
+class NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_TIMER = NullTimer()
+
+
+# Opt-in timings of where the script spends its time: finding fonts, loading them, rendering and printing.
+# Renders are also recorded per font, so slow fonts stand out in the report.
+class Instrumentation:
+    PERCENTILES = (50, 90, 99)
+
+    def __init__(self, report_path="-", profile_path=None, top_fonts=20):
+        self.report_path = report_path
+        self.profile_path = profile_path
+        self.top_fonts = top_fonts
+        self.timings = {}
+        self.font_timings = {}
+        self.profiler = None
+        if profile_path is not None:
+            import cProfile
+
+            self.profiler = cProfile.Profile()
+
+    def start(self):
+        if self.profiler is not None:
+            self.profiler.enable()
+
+    def timer(self, category, font=None):
+        return Timer(self, category, font)
+
+    def record(self, category, seconds, font=None):
+        self.timings.setdefault(category, []).append(seconds)
+        if font is not None:
+            self.font_timings.setdefault(font, []).append(seconds)
+
+    # The value below which p percent of the values fall, using the nearest rank
+    @staticmethod
+    def percentile(sorted_values, p):
+        rank = -(-len(sorted_values) * p // 100)
+        return sorted_values[max(rank - 1, 0)]
+
+    def _summary_row(self, name, values):
+        values = sorted(values)
+        row = f"{name:<28} {len(values):>7} {sum(values) * 1000:>11.1f}"
+        for p in self.PERCENTILES:
+            row += f" {self.percentile(values, p) * 1000:>9.3f}"
+        return row + f" {values[-1] * 1000:>9.3f}"
+
+    def report(self):
+        header = f"{'':<28} {'count':>7} {'total ms':>11}"
+        for p in self.PERCENTILES:
+            header += f" {f'p{p} ms':>9}"
+        header += f" {'max ms':>9}"
+
+        lines = ["Timings", header]
+        for category, values in sorted(self.timings.items(), key=lambda item: -sum(item[1])):
+            lines.append(self._summary_row(category, values))
+
+        if self.font_timings:
+            # Fonts with the slowest typical render come first
+            fonts = sorted(self.font_timings.items(),
+                           key=lambda item: -self.percentile(sorted(item[1]), 90))
+            lines += ["", f"Render time per font, slowest {min(self.top_fonts, len(fonts))} of {len(fonts)}", header]
+            for font, values in fonts[:self.top_fonts]:
+                lines.append(self._summary_row(font, values))
+        return "\n".join(lines) + "\n"
+
+    # Writes the report and the cProfile output, called when the script exits
+    def dump(self):
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiler.dump_stats(self.profile_path)
+
+        report = self.report()
+        if self.profile_path is not None:
+            report += f"\ncProfile output saved to {self.profile_path}, view it with: python -m pstats {self.profile_path}\n"
+        if self.report_path == "-":
+            sys.stderr.write("\n" + report)
+        else:
+            with open(self.report_path, "w") as file:
+                file.write(report)
+
+
+instrumentation = None
+
+
+# A function to time a block of code under a category (and a font, for renders) when instrumentation is on
+def timed(category, font=None):
+    if instrumentation is None:
+        return NULL_TIMER
+    return instrumentation.timer(category, font)
+
+
+# A function to turn on instrumentation, reporting the timings when the script exits
+def enable_instrumentation(report_path="-", profile_path=None):
+    global instrumentation
+    import atexit
+
+    instrumentation = Instrumentation(report_path, profile_path)
+    atexit.register(instrumentation.dump)
+    instrumentation.start()
+    return instrumentation
+
+
+# How many parsed fonts to keep loaded at once
+FONT_CACHE_SIZE = 32
+
+# Width passed to pyfiglet so that text is never wrapped
+UNLIMITED_WIDTH = 9999999999999999
+
+
+# A bounded cache of loaded fonts, so rendering with the same font again skips reading and parsing its file.
+# The least recently used font is evicted once the cache is full.
+class FontCache:
+    def __init__(self, max_size=FONT_CACHE_SIZE):
+        self.max_size = max_size
+        self.fonts = OrderedDict()
+        self.atlases = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, font):
+        figlet = self.fonts.get(font)
+        if figlet is not None:
+            self.fonts.move_to_end(font)
+            self.hits += 1
+            return figlet
+
+        self.misses += 1
+        # Right-to-left fonts are right-justified by default, which pads every row out to the full
+        # (effectively infinite) width, so always justify left
+        with timed("font load"):
+            figlet = pyfiglet.Figlet(font=font, width=UNLIMITED_WIDTH, justify="left")
+        self.fonts[font] = figlet
+        self._evict()
+        return figlet
+
+    # The glyph atlas for a font, compiled the first time it is asked for and evicted along with the font
+    def get_atlas(self, font):
+        figlet = self.get(font)
+        atlas = self.atlases.get(font)
+        if atlas is None:
+            with timed("glyph atlas build"):
+                atlas = GlyphAtlas(figlet)
+            self.atlases[font] = atlas
+        return atlas
+
+    def resize(self, max_size):
+        self.max_size = max_size
+        self._evict()
+
+    def clear(self):
+        self.fonts.clear()
+        self.atlases.clear()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.fonts), "max_size": self.max_size}
+
+    def _evict(self):
+        while len(self.fonts) > self.max_size:
+            font, _ = self.fonts.popitem(last=False)
+            self.atlases.pop(font, None)
+
+
+# Smushing rule bits from the font header, as used by pyfiglet
+SM_EQUAL = 1
+SM_LOWLINE = 2
+SM_HIERARCHY = 4
+SM_PAIR = 8
+SM_BIGX = 16
+SM_HARDBLANK = 32
+SM_KERN = 64
+SM_SMUSH = 128
+
+
+# A font compiled into a compact glyph atlas: each glyph's rows plus the edge profile of every row
+# (leading blanks, first and last visible character). Text is rendered by looking glyphs up and
+# joining their rows, with a table of how each pair of touching characters smushes together,
+# instead of pyfiglet's per-character string rebuilding. The output is identical to pyfiglet's.
+# How far two glyphs overlap can depend on glyphs further back on the line (a narrow or blank glyph
+# lets the next one reach past it), so overlaps are worked out per row from the edge profiles
+# rather than stored per glyph pair.
+class GlyphAtlas:
+    def __init__(self, figlet):
+        font = figlet.Font
+        self.height = font.height
+        self.hard_blank = font.hardBlank
+        self.smush_mode = font.smushMode
+
+        # Only left-to-right fonts are compiled, the rest are always rendered by pyfiglet
+        self.supported = figlet.direction == "left-to-right"
+
+        # Each glyph is (rows, width, leading blanks per row, first character per row, last visible index per row)
+        self.glyphs = {}
+        for code, rows in font.chars.items():
+            leads = []
+            firsts = []
+            lasts = []
+            for row in rows:
+                lead = len(row) - len(row.lstrip(" "))
+                leads.append(lead)
+                firsts.append(row[lead] if lead < len(row) else "")
+                lasts.append(len(row.rstrip(" ")) - 1)
+            self.glyphs[code] = (rows, font.width[code], leads, firsts, lasts)
+
+        # (left, right) -> smushed character or None, filled in as pairs are first seen
+        self.smush_table = {}
+
+    # How two touching characters combine, or None if they can't overlap
+    def smush(self, left, right, narrow):
+        if left == " ":
+            return right
+        if right == " ":
+            return left
+        # Glyphs narrower than 2 columns never overlap their neighbours
+        if narrow:
+            return None
+        try:
+            return self.smush_table[(left, right)]
+        except KeyError:
+            smushed = self.smush_table[(left, right)] = self._smush_rule(left, right)
+            return smushed
+
+    # pyfiglet's smushing rules for two visible characters of left-to-right text
+    def _smush_rule(self, left, right):
+        mode = self.smush_mode
+        hard_blank = self.hard_blank
+
+        if mode & SM_SMUSH == 0:
+            return None
+
+        # Universal overlapping: the later character wins, unless it's a hard blank
+        if mode & 63 == 0:
+            if left == hard_blank:
+                return right
+            if right == hard_blank:
+                return left
+            return right
+
+        if mode & SM_HARDBLANK and left == hard_blank and right == hard_blank:
+            return left
+        if left == hard_blank or right == hard_blank:
+            return None
+        if mode & SM_EQUAL and left == right:
+            return left
+
+        smushes = ()
+        if mode & SM_LOWLINE:
+            smushes += (("_", r"|/\[]{}()<>"),)
+        if mode & SM_HIERARCHY:
+            smushes += (("|", r"/\[]{}()<>"), (r"\/", "[]{}()<>"), ("[]", "{}()<>"), ("{}", "()<>"), ("()", "<>"))
+        for a, b in smushes:
+            if left in a and right in b:
+                return right
+            if right in a and left in b:
+                return left
+
+        if mode & SM_PAIR and left + right in ("[]", "{}", "()", "][", "}{", ")("):
+            return "|"
+
+        if mode & SM_BIGX:
+            if left == "/" and right == "\\":
+                return "|"
+            if left == "\\" and right == "/":
+                return "Y"
+            if left == ">" and right == "<":
+                return "X"
+        return None
+
+    # Renders one line of text as a list of row character lists, or returns None if pyfiglet
+    # would have to wrap it at this width
+    def _render_line(self, line, width):
+        height = self.height
+        rows = [[] for _ in range(height)]
+        lasts = [-1] * height
+        prev_width = 0
+        can_overlap = self.smush_mode & (SM_SMUSH | SM_KERN)
+
+        for char in line:
+            glyph = self.glyphs.get(ord(char))
+            if glyph is None:
+                continue
+            glyph_rows, glyph_width, leads, firsts, glyph_lasts = glyph
+            if width < glyph_width:
+                return None
+            narrow = prev_width < 2 or glyph_width < 2
+
+            # How far this glyph can slide left into the line: the smallest gap over all rows
+            overlap = 0
+            if can_overlap:
+                overlap = glyph_width
+                for r in range(height):
+                    row = rows[r]
+                    length = len(row)
+                    edge = lasts[r] if lasts[r] > 0 else 0
+                    if edge < length:
+                        left = row[edge]
+                    else:
+                        edge = 0
+                        left = ""
+                    amount = leads[r] + length - 1 - edge
+                    if left == "" or left == " ":
+                        amount += 1
+                    elif firsts[r] != "" and self.smush(left, firsts[r], narrow) is not None:
+                        amount += 1
+                    if amount < overlap:
+                        overlap = amount
+
+            if len(rows[0]) + glyph_width - overlap >= width:
+                return None
+
+            for r in range(height):
+                row = rows[r]
+                glyph_row = glyph_rows[r]
+                length = len(row)
+                start = length - overlap
+                for i in range(max(0, -start), overlap):
+                    smushed = self.smush(row[start + i], glyph_row[i], narrow)
+                    if smushed is None:
+                        raise ValueError("glyphs overlap where they can't be smushed")
+                    row[start + i] = smushed
+                row.extend(glyph_row[overlap:])
+
+                # Track the last visible character. Smushing never turns a visible character blank.
+                if glyph_lasts[r] >= overlap:
+                    lasts[r] = start + glyph_lasts[r]
+                else:
+                    for i in range(length - 1, max(start, 0) - 1, -1):
+                        if row[i] != " ":
+                            lasts[r] = max(lasts[r], i)
+                            break
+
+            prev_width = glyph_width
+        return rows
+
+    # Renders text the same way pyfiglet would, or returns None if this text needs pyfiglet
+    def render(self, text, width=UNLIMITED_WIDTH):
+        if not self.supported:
+            return None
+
+        lines = text.split("\n")
+        blocks = []
+        for i, line in enumerate(lines):
+            rows = self._render_line(line, width)
+            if rows is None:
+                return None
+            # Every line ends up in the output except a trailing empty one
+            if i < len(lines) - 1 or rows[0]:
+                blocks.append("\n".join("".join(row) for row in rows) + "\n")
+        return "".join(blocks).replace(self.hard_blank, " ")
+
+
+# Render with glyph atlases where possible, falling back to pyfiglet otherwise
+USE_GLYPH_ATLAS = True
+
+# Phrases every font is rendered with when checking atlases against pyfiglet
+ATLAS_CONFORMANCE_SAMPLES = [
+    "Hello, World!",
+    "".join(chr(i) for i in range(32, 127)),
+    "The quick brown fox\njumps over\n\nthe lazy dog\n",
+    "ÄÖÜäöüß ~_|/\\[]{}()<> é€",
+    "i l 1 . ' : ;",
+]
+
+
+# A function to check that every font's glyph atlas renders exactly what pyfiglet does.
+# Returns the (font, sample) pairs that differ.
+def check_glyph_atlases(fonts, samples=ATLAS_CONFORMANCE_SAMPLES):
+    mismatches = []
+    for font in fonts:
+        atlas = font_cache.get_atlas(font)
+        for sample in samples:
+            try:
+                result = atlas.render(sample)
+            except (ValueError, IndexError):
+                result = None
+            if result is None:
+                continue
+            if result != pyfiglet.figlet_format(sample, font=font, width=UNLIMITED_WIDTH):
+                mismatches.append((font, sample))
+    return mismatches
+
+
+font_cache = FontCache()
+
+
+SCRIPT_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+# Where the font catalog is cached between runs
+FONT_CATALOG_PATH = os.path.join(SCRIPT_DIRECTORY, ".font_catalog.json")
+
+
+# Every available font, sorted by name, with a first-letter index and per-font metadata.
+# Built once by scanning and parsing the fonts, then saved to disk until the font directories change.
+class FontCatalog:
+    def __init__(self, metadata):
+        self.metadata = metadata
+        self.names = sorted(metadata, key=str.lower)
+
+        # Index of the first font starting with each letter, for jumping straight to it
+        self.letter_index = {}
+        for i, name in enumerate(self.names):
+            self.letter_index.setdefault(name[0].lower(), i)
+
+    def __contains__(self, font):
+        return font in self.metadata
+
+    def __len__(self):
+        return len(self.names)
+
+    def first_index(self, letter, default=0):
+        return self.letter_index.get(letter.lower(), default)
+
+    # Directories fonts are loaded from, and when each was last modified
+    @staticmethod
+    def source_mtimes():
+        import importlib.resources
+
+        directories = [str(importlib.resources.files("pyfiglet.fonts"))]
+        if os.path.isdir(pyfiglet.SHARED_DIRECTORY):
+            directories.append(pyfiglet.SHARED_DIRECTORY)
+        return {directory: os.stat(directory).st_mtime for directory in directories}
+
+    @classmethod
+    def build(cls):
+        metadata = {}
+        for name in pyfiglet.FigletFont.getFonts():
+            try:
+                font = pyfiglet.FigletFont(name)
+            except pyfiglet.FigletError:
+                continue
+            lowercase = [font.chars.get(ord(c)) for c in "abcdefghijklmnopqrstuvwxyz"]
+            uppercase = [font.chars.get(ord(c)) for c in "ABCDEFGHIJKLMNOPQRSTUVWXYZ"]
+            metadata[name] = {
+                "height": font.height,
+                "lowercase": any(lower and lower != upper for lower, upper in zip(lowercase, uppercase)),
+            }
+        return cls(metadata)
+
+    # Loads the catalog from disk, rebuilding it if it is missing or any font directory has changed
+    @classmethod
+    def load(cls, path=FONT_CATALOG_PATH):
+        mtimes = cls.source_mtimes()
+        try:
+            with open(path) as file:
+                cached = json.load(file)
+            if cached["pyfiglet_version"] == pyfiglet.__version__ and cached["mtimes"] == mtimes:
+                return cls(cached["fonts"])
+        except (OSError, ValueError, KeyError):
+            pass
+
+        print("Building font catalog...")
+        catalog = cls.build()
+        try:
+            with open(path, "w") as file:
+                json.dump({"pyfiglet_version": pyfiglet.__version__, "mtimes": mtimes, "fonts": catalog.metadata}, file)
+        except OSError as e:
+            print(f"Could not save the font catalog: {e}")
+        return catalog
+
+
+font_catalog = None
+
+
+# A function to get the font catalog, loading it the first time it is needed
+def get_font_catalog():
+    global font_catalog
+    if font_catalog is None:
+        with timed("font catalog load"):
+            font_catalog = FontCatalog.load()
+    return font_catalog
+
+
+# How many rendered results to keep in memory, and in the on-disk store
+RENDER_CACHE_SIZE = 256
+RENDER_CACHE_DISK_SIZE = 10000
+
+# Where rendered results are kept between sessions. Set to None to only cache in memory.
+RENDER_CACHE_PATH = os.path.join(SCRIPT_DIRECTORY, ".render_cache.sqlite3")
 
-import random
-import pyfiglet
+
+# A cache of rendered ASCII art keyed by (text, font, width).
+# Recent results are kept in memory, and every result is also written to a sqlite file so it survives restarts.
+# Both are bounded, evicting the least recently used results first.
+class RenderCache:
+    def __init__(self, max_size=RENDER_CACHE_SIZE, path=None, max_disk_size=RENDER_CACHE_DISK_SIZE):
+        self.max_size = max_size
+        self.max_disk_size = max_disk_size
+        self.results = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.writes_since_trim = 0
+        self.db = None
+        if path is not None:
+            self._open(path)
+
+    def _open(self, path):
+        import sqlite3
+
+        try:
+            self.db = sqlite3.connect(path)
+            # Commits don't wait for the disk, so storing a whole batch of previews stays fast
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self.db.execute("CREATE TABLE IF NOT EXISTS renders (text TEXT, font TEXT, width INTEGER, result TEXT, "
+                            "used REAL, PRIMARY KEY (text, font, width))")
+            self.db.execute("CREATE INDEX IF NOT EXISTS renders_used ON renders (used)")
+
+            # Results rendered by a different pyfiglet version may not match, so start over
+            row = self.db.execute("SELECT value FROM meta WHERE key = 'pyfiglet_version'").fetchone()
+            if row is None or row[0] != pyfiglet.__version__:
+                self.db.execute("DELETE FROM renders")
+                self.db.execute("INSERT OR REPLACE INTO meta VALUES ('pyfiglet_version', ?)", (pyfiglet.__version__,))
+            self.db.commit()
+        except sqlite3.Error as e:
+            print(f"Could not open the render cache, results will only be cached in memory: {e}")
+            self.db = None
+
+    def get(self, text, font, width):
+        key = (text, font, width)
+        result = self.results.get(key)
+        if result is not None:
+            self.results.move_to_end(key)
+            self.hits += 1
+            return result
+
+        if self.db is not None:
+            row = self.db.execute("SELECT result FROM renders WHERE text = ? AND font = ? AND width = ?",
+                                  (text, font, width)).fetchone()
+            if row is not None:
+                self.db.execute("UPDATE renders SET used = ? WHERE text = ? AND font = ? AND width = ?",
+                                (time.time(), text, font, width))
+                self.db.commit()
+                self.disk_hits += 1
+                self._remember(key, row[0])
+                return row[0]
+
+        self.misses += 1
+        return None
+
+    def put(self, text, font, width, result):
+        self._remember((text, font, width), result)
+        if self.db is None:
+            return
+
+        self.db.execute("INSERT OR REPLACE INTO renders VALUES (?, ?, ?, ?, ?)",
+                        (text, font, width, result, time.time()))
+        self.writes_since_trim += 1
+        if self.writes_since_trim >= 100:
+            self._trim_disk()
+        self.db.commit()
+
+    def clear(self):
+        self.results.clear()
+        if self.db is not None:
+            self.db.execute("DELETE FROM renders")
+            self.db.commit()
+
+    def stats(self):
+        return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                "size": len(self.results), "max_size": self.max_size}
+
+    def _remember(self, key, result):
+        self.results[key] = result
+        self.results.move_to_end(key)
+        while len(self.results) > self.max_size:
+            self.results.popitem(last=False)
+
+    def _trim_disk(self):
+        self.writes_since_trim = 0
+        self.db.execute("DELETE FROM renders WHERE rowid IN "
+                        "(SELECT rowid FROM renders ORDER BY used DESC LIMIT -1 OFFSET ?)", (self.max_disk_size,))
+
+
+render_cache = None
+
+
+# A function to get the render cache, opening its on-disk store the first time it is needed
+def get_render_cache():
+    global render_cache
+    if render_cache is None:
+        render_cache = RenderCache(path=RENDER_CACHE_PATH)
+    return render_cache
+
+
+# A function to render text as ASCII art using a cached font, without looking at the render cache
+def render_figlet(text, font, width=UNLIMITED_WIDTH):
+    if USE_GLYPH_ATLAS:
+        atlas = font_cache.get_atlas(font)
+        start = time.perf_counter()
+        try:
+            result = atlas.render(text, width)
+        except (ValueError, IndexError):
+            result = None
+        if result is not None:
+            # Only renders the atlas finished are timed here, the rest are timed as pyfiglet renders below
+            if instrumentation is not None:
+                instrumentation.record("render (glyph atlas)", time.perf_counter() - start, font)
+            return result
+
+    figlet = font_cache.get(font)
+    figlet.width = width
+    with timed("render (pyfiglet)", font):
+        return str(figlet.renderText(text))
+
+
+# A function to get how many columns the terminal has, for wrapping rendered text to fit it
+def get_terminal_width():
+    return shutil.get_terminal_size().columns
+
+
+# A function to get how many columns wide a piece of rendered ASCII art is
+def rendered_width(rendered):
+    return max((len(row) for row in rendered.split("\n")), default=0)
+
+
+# A function to render text one line of ASCII art at a time, wrapping words to fit the given width
+# (the terminal's by default). Each line is yielded as soon as it is rendered, so output can start
+# right away and long text never has to be rendered all at once.
+def iter_render(text, font, width=None):
+    if width is None:
+        width = get_terminal_width()
+
+    paragraphs = text.split("\n")
+    for i, paragraph in enumerate(paragraphs):
+        if width == UNLIMITED_WIDTH:
+            if paragraph:
+                yield render_figlet(paragraph, font)
+            # An empty line renders as nothing on its own, but pyfiglet gives it a blank line of the font's height
+            elif i < len(paragraphs) - 1:
+                yield "\n" * font_cache.get(font).Font.height
+            continue
+
+        # Blank lines in the text become a blank line of the font's height, like pyfiglet does
+        if not paragraph.strip():
+            if i < len(paragraphs) - 1:
+                yield "\n" * font_cache.get(font).Font.height
+            continue
+
+        line = ""
+        rendered = ""
+        for word in paragraph.split():
+            candidate = f"{line} {word}" if line else word
+            candidate_rendered = render_figlet(candidate, font)
+            if rendered_width(candidate_rendered) < width:
+                line, rendered = candidate, candidate_rendered
+                continue
+
+            if line:
+                yield rendered
+            line, rendered = word, render_figlet(word, font)
+
+            # A word too wide for a line on its own is broken between its characters
+            if rendered_width(rendered) >= width:
+                line = ""
+                for char in word:
+                    candidate = line + char
+                    candidate_rendered = render_figlet(candidate, font)
+                    if line and rendered_width(candidate_rendered) >= width:
+                        yield rendered
+                        candidate, candidate_rendered = char, render_figlet(char, font)
+                    line, rendered = candidate, candidate_rendered
+
+        if line:
+            yield rendered
+
+
+# A function to render text as ASCII art wrapped to the given width, all at once
+def render_wrapped(text, font, width=UNLIMITED_WIDTH):
+    if width == UNLIMITED_WIDTH:
+        return render_figlet(text, font)
+    return "".join(iter_render(text, font, width))
+
+
+# A function to render text as ASCII art, reusing the result if it has been rendered before
+def render_text(text, font, width=UNLIMITED_WIDTH):
+    cache = get_render_cache()
+    result = cache.get(text, font, width)
+    if result is None:
+        result = render_wrapped(text, font, width)
+        cache.put(text, font, width, result)
+    return result
+
+
+# A function to stream rendered text like iter_render, but through the render cache: text rendered
+# before comes back as one block, and new text is cached once every line has been rendered
+def iter_render_cached(text, font, width=None):
+    if width is None:
+        width = get_terminal_width()
+    if width == UNLIMITED_WIDTH:
+        yield render_text(text, font, width)
+        return
+
+    cache = get_render_cache()
+    result = cache.get(text, font, width)
+    if result is not None:
+        yield result
+        return
+
+    blocks = []
+    for block in iter_render(text, font, width):
+        blocks.append(block)
+        yield block
+    cache.put(text, font, width, "".join(blocks))
 
 
 # A function for error handling when the user is asked to input a number
@@ -46,26 +797,80 @@ def get_word_input(prompt):
 
 # A function to generate a list of n random fonts
 def get_random_fonts(n):
-    font_list = pyfiglet.FigletFont.getFonts()
-    print(len(font_list))
-    return random.sample(font_list, n)
+    with timed("get_random_fonts"):
+        font_list = get_font_catalog().names
+        print(len(font_list))
+        return random.sample(font_list, n)
+
+# Batches with fewer fonts than this are rendered in this process, since starting workers would take longer
+PARALLEL_PREVIEW_THRESHOLD = 8
+
+preview_pool = None
+
+
+# A function to get the pool of preview workers, starting it the first time it is needed
+def get_preview_pool():
+    global preview_pool
+    if preview_pool is None:
+        import concurrent.futures
+
+        preview_pool = concurrent.futures.ProcessPoolExecutor()
+    return preview_pool
+
+
+# Renders one preview in a worker process. Each worker keeps its own font cache between previews.
+# Returns the preview and whether it rendered successfully.
+def render_preview(job):
+    text, font, width = job
+    try:
+        return render_wrapped(text, font, width), True
+    except pyfiglet.FigletError as e:
+        return f"Could not render this font: {e}", False
+
+
+# A function to render text in each font, yielding (font, preview) pairs in order as soon as each is ready.
+# Previews that have been rendered before come from the render cache, and large batches of new ones
+# are spread across a pool of worker processes.
+def iter_previews(text, fonts, width=UNLIMITED_WIDTH):
+    cache = get_render_cache()
+    previews = [cache.get(text, font, width) for font in fonts]
+    jobs = [(text, font, width) for font, preview in zip(fonts, previews) if preview is None]
+
+    # Instrumented runs render everything here, so every render is timed and profiled
+    if len(jobs) < PARALLEL_PREVIEW_THRESHOLD or instrumentation is not None:
+        rendered = map(render_preview, jobs)
+    else:
+        rendered = get_preview_pool().map(render_preview, jobs, chunksize=2)
+
+    for font, preview in zip(fonts, previews):
+        if preview is None:
+            preview, rendered_ok = next(rendered)
+            if rendered_ok:
+                cache.put(text, font, width, preview)
+        yield font, preview
+
 
 # A function to display a list of available fonts
 def display_fonts(font_examples):
     print("Some available fonts:")
-    for i, font in enumerate(font_examples):
-        print(f"{i+1}: {font}")
-        print(pyfiglet.figlet_format(example_phrase, font=font, width=9999999999999999))
-        print("\n")
+    for i, (font, preview) in enumerate(iter_previews(example_phrase, font_examples, get_terminal_width())):
+        with timed("print"):
+            print(f"{i+1}: {font}")
+            print(preview)
+            print("\n")
 
 # A function to prompt the user to select a font
 def get_font(font_examples, random_font_amount):
-    font_list = pyfiglet.FigletFont.getFonts()
+    catalog = get_font_catalog()
     while True:
-        font_input = input("Enter a font number, the name of a font, 'r' to generate another batch of random fonts, 'a' to change how many are in a batch of random fonts, or 'c' to cycle through available fonts: ")
+        font_input = input("Enter a font number, the name of a font, 'r' to generate another batch of random fonts, 'a' to change how many are in a batch of random fonts, 'v' to preview every font, or 'c' to cycle through available fonts: ")
         if font_input.lower() == 'c':
             cycle_fonts()
             continue
+        if font_input.lower() == 'v':
+            font_examples = catalog.names
+            display_fonts(font_examples)
+            continue
         if font_input.lower() == 'r':
             font_examples = get_random_fonts(random_font_amount)
             display_fonts(font_examples)
@@ -78,18 +883,21 @@ def get_font(font_examples, random_font_amount):
             if font_index >= 0 and font_index < len(font_examples):
                 return font_examples[font_index]
         else:
-            if font_input in font_list:
+            if font_input in catalog:
                 return font_input
         print("Invalid input. Please enter a valid font number, name, or the letter 'c' to cycle through available fonts.")
 
 # A function to cycle through all available fonts
 def cycle_fonts():
-    font_list = pyfiglet.FigletFont.getFonts()
+    catalog = get_font_catalog()
+    font_list = catalog.names
     index = 0
     while True:
         font = font_list[index]
         print(f"Font: {font}")
-        print(pyfiglet.figlet_format(example_phrase, font=font, width=9999999999999999))
+        preview = render_text(example_phrase, font, get_terminal_width())
+        with timed("print"):
+            print(preview)
         response = get_letter_input("Enter 'n' for next font, 'p' for previous font, 's' to skip to a specific letter, or 'q' to quit cycling: ")
         if response == "n":
             index = (index + 1) % len(font_list)
@@ -97,7 +905,7 @@ def cycle_fonts():
             index = (index - 1) % len(font_list)
         elif response == "s":
             letter = get_letter_input("Enter the first letter of the font you want to skip to: ")
-            index = next((i for i, font in enumerate(font_list) if font.startswith(letter)), index)
+            index = catalog.first_index(letter, index)
         else:
             break
     return font_list[index]
@@ -124,13 +932,152 @@ def append_file_extension(file_path, extension):
     return f"{root}.{extension}"
 
 
-def save_to_file(ascii_art):
+# File extension used for each export format
+EXPORT_EXTENSIONS = {"txt": "txt", "ansi": "ans", "html": "html", "png": "png"}
+
+# ANSI color code the art is drawn in when exporting colored text
+ANSI_COLOR = "36"
+
+
+# Cached bitmaps of single characters, so ASCII art can be drawn as an image by pasting one bitmap per character
+class GlyphBitmapCache:
+    def __init__(self, size=14):
+        from PIL import ImageFont
+
+        try:
+            self.font = ImageFont.truetype("DejaVuSansMono.ttf", size)
+        except OSError:
+            self.font = ImageFont.load_default()
+
+        # Every character gets a cell of the same size, so columns line up even if the font isn't monospaced
+        ascent, descent = self.font.getmetrics()
+        self.cell_width = max(int(self.font.getlength(chr(i))) for i in range(32, 127)) or 1
+        self.cell_height = ascent + descent
+        self.bitmaps = {}
+
+    def get(self, char):
+        bitmap = self.bitmaps.get(char)
+        if bitmap is None:
+            from PIL import Image, ImageDraw
+
+            bitmap = Image.new("L", (self.cell_width, self.cell_height), 0)
+            ImageDraw.Draw(bitmap).text((0, 0), char, fill=255, font=self.font)
+            self.bitmaps[char] = bitmap
+        return bitmap
+
+    # Draws the text as dark characters on a white image
+    def rasterize(self, text):
+        from PIL import Image
+
+        lines = text.split("\n")
+        columns = max((len(line) for line in lines), default=0)
+        image = Image.new("L", (max(columns, 1) * self.cell_width, max(len(lines), 1) * self.cell_height), 255)
+        for row, line in enumerate(lines):
+            for column, char in enumerate(line):
+                if char != " ":
+                    image.paste(0, (column * self.cell_width, row * self.cell_height), self.get(char))
+        return image
+
+
+glyph_bitmaps = None
+
+
+# A function to get the glyph bitmap cache, loading Pillow and its font the first time it is needed
+def get_glyph_bitmaps():
+    global glyph_bitmaps
+    if glyph_bitmaps is None:
+        glyph_bitmaps = GlyphBitmapCache()
+    return glyph_bitmaps
+
+
+# A function to turn ASCII art into the bytes of a file in the given export format
+def format_ascii_art(ascii_art, export_format):
+    if export_format == "txt":
+        return ascii_art.encode("utf-8")
+    if export_format == "ansi":
+        lines = [f"\033[{ANSI_COLOR}m{line}\033[0m" if line else line for line in ascii_art.split("\n")]
+        return "\n".join(lines).encode("utf-8")
+    if export_format == "html":
+        return ("<!DOCTYPE html>\n<html>\n<head><meta charset=\"utf-8\"></head>\n<body>\n<pre>"
+                + html.escape(ascii_art) + "</pre>\n</body>\n</html>\n").encode("utf-8")
+    if export_format == "png":
+        buffer = io.BytesIO()
+        get_glyph_bitmaps().rasterize(ascii_art.rstrip("\n")).save(buffer, format="PNG")
+        return buffer.getvalue()
+    raise ValueError(f"Unknown export format: {export_format}")
+
+
+# A function to write a file all at once without ever leaving a half-written file behind:
+# the data goes to a temporary file in the same directory, which then replaces the target
+def write_file_atomically(path, data):
+    directory = os.path.dirname(os.path.abspath(path))
+    file_descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.basename(path))
+    try:
+        # mkstemp makes the file private, so give it the permissions a normally created file would have
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(temp_path, 0o666 & ~umask)
+        with os.fdopen(file_descriptor, "wb") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+# A function to save ASCII art in each of the given formats next to each other, e.g. art.txt, art.html and art.png.
+# Text formats can be gzipped. Returns the paths written.
+def export_ascii_art(ascii_art, path, formats=("txt",), compress=False):
+    root = os.path.splitext(path)[0]
+    paths = []
+    for export_format in formats:
+        data = format_ascii_art(ascii_art, export_format)
+        export_path = append_file_extension(root, EXPORT_EXTENSIONS[export_format])
+        # PNG is already compressed, so only text formats are gzipped
+        if compress and export_format != "png":
+            data = gzip.compress(data)
+            export_path += ".gz"
+        write_file_atomically(export_path, data)
+        paths.append(export_path)
+    return paths
+
+
+# A function to ask which formats to save in, and whether to gzip them
+def get_export_options():
+    while True:
+        answer = input("Enter the formats to save as, separated by spaces (txt, ansi, html, png), or press enter for txt: ").lower().split()
+        formats = answer or ["txt"]
+        unknown = [export_format for export_format in formats if export_format not in EXPORT_EXTENSIONS]
+        if not unknown:
+            break
+        print(f"Unknown format: {', '.join(unknown)}. Please try again.")
+
+    compress = False
+    if any(export_format != "png" for export_format in formats):
+        compress = input("Gzip the text files? Enter 'y' for Yes or 'n' for No: ").lower() == "y"
+    return formats, compress
+
+
+# A function to ask the user whether and where to save the ASCII art from this session.
+# With more than one result, they can save just the last one or all of them together.
+def save_to_file(results):
     while True:
         print("Do you want to save the ASCII art to a file?")
         user_input = input("Enter 'y' for Yes or 'n' for No: ").lower()
         if user_input == "n":
             return
         elif user_input == "y":
+            ascii_art = results[-1]
+            if len(results) > 1:
+                print(f"You rendered {len(results)} results this session.")
+                choice = input("Enter 'a' to save all of them, or anything else to save just the last one: ").lower()
+                if choice == "a":
+                    ascii_art = "\n".join(results)
+
+            formats, compress = get_export_options()
+
             while True:
                 print("Where would you like to save the file?")
                 file_location = input("Enter 'd' for Desktop, 's' for script directory, 'o' for other, or 'b' to go back: ").lower()
@@ -160,17 +1107,20 @@ def save_to_file(ascii_art):
             if file_location == "b":
                 continue
 
-            full_path = append_file_extension(full_path, "txt")
+            full_path = append_file_extension(full_path, EXPORT_EXTENSIONS[formats[0]])
             while True:
                 print(f"Are you sure you want to save the file to {full_path}?")
+                if len(formats) > 1:
+                    print(f"It will also be saved as {', '.join(formats[1:])} next to it.")
                 confirm = input("Enter 'y' for Yes or 'n' for No: ").lower()
                 if confirm == "n":
                     break
                 elif confirm == "y":
                     try:
-                        with open(full_path, "w") as file:
-                            file.write(ascii_art)
-                            print(f"The ASCII art has been saved to {full_path}.")
+                        for path in export_ascii_art(ascii_art, full_path, formats, compress):
+                            print(f"The ASCII art has been saved to {path}.")
+                    except ImportError:
+                        print("Saving as png needs Pillow. Install it with: pip install pillow")
                     except IOError as e:
                         print(f"An error occurred while saving the file: {e}")
                     break
@@ -183,47 +1133,147 @@ def save_to_file(ascii_art):
 
 
 
-while True:
-    # Get an example phrase to use while finding a font
-    example_phrase = get_word_input("Enter some text, a letter, or a phrase to use as an example phrase while selecting a font: ")
+# A function to run the interactive session: pick a font, render text with it, and optionally save the result
+def interactive_session():
+    global example_phrase
+
+    while True:
+        # Get an example phrase to use while finding a font
+        example_phrase = get_word_input("Enter some text, a letter, or a phrase to use as an example phrase while selecting a font: ")
 
-    # Generate a random list of fonts to display as examples for the user to select from
-    random_font_amount = 5
-    font_examples = get_random_fonts(random_font_amount)
+        # Generate a random list of fonts to display as examples for the user to select from
+        random_font_amount = 5
+        font_examples = get_random_fonts(random_font_amount)
 
-    # Display an example list of available fonts
-    display_fonts(font_examples)
+        # Display an example list of available fonts
+        display_fonts(font_examples)
 
-    # Get the user input for the font
-    font = get_font(font_examples, random_font_amount)
+        # Get the user input for the font
+        font = get_font(font_examples, random_font_amount)
 
-    # Print the selected font
-    print("Font selected: ", font)
+        # Print the selected font
+        print("Font selected: ", font)
 
-    while True:
-        # Get the user input for the text
-        text = get_word_input("Enter some text, a letter, or a phrase: ")
+        # Every result rendered this time around, so they can all be saved together
+        results = []
+
+        while True:
+            # Get the user input for the text
+            text = get_word_input("Enter some text, a letter, or a phrase: ")
+
+            # Generate the ASCII art lettering
+            print("")
+            font_used = f"Font being used: {font}\n"
+            text_printed = f"Text being printed: {text}\n\n"
+            result = font_used + text_printed
+
+            # Print the result a line at a time as it is rendered
+            print(result, end="")
+            for block in iter_render_cached(text, font):
+                with timed("print"):
+                    print(block, end="")
+                result += block
+            print("")
+            results.append(result)
 
-        # Generate the ASCII art lettering
-        print("")
-        font_used = f"Font being used: {font}\n"
-        text_printed = f"Text being printed: {text}\n\n"
-        result = font_used + text_printed
-        result += pyfiglet.figlet_format(text, font=font, width=9999999999999999)
+            # Ask the user if they'd like to stick with the result, or try another word
+            print("\nWould you like to try another text, letter, or phrase?")
+            response = input("Enter 'y' for Yes or 'n' for No: ")
+            if response.lower() != "y":
+                break
 
-        # Print the result
-        print(result)
+        # Ask the user if they'd like to save the results to a file
+        save_to_file(results)
 
-        # Ask the user if they'd like to stick with the result, or try another word
-        print("\nWould you like to try another text, letter, or phrase?")
+        print("\n\n\nDo you want to run the program again?")
         response = input("Enter 'y' for Yes or 'n' for No: ")
         if response.lower() != "y":
             break
 
-    # Ask the user if they'd like to save the result to a .txt file
-    save_to_file(result)
 
-    print("\n\n\nDo you want to run the program again?")
-    response = input("Enter 'y' for Yes or 'n' for No: ")
-    if response.lower() != "y":
-        break
+# A function to render every line of text in each font without any prompts.
+# Fonts are loaded once and reused for every line. Results go to stdout, or to one file per font.
+def render_batch(lines, fonts, output_path=None, width=UNLIMITED_WIDTH):
+    if output_path is None:
+        for font in fonts:
+            for line in lines:
+                for block in iter_render(line, font, width):
+                    with timed("print"):
+                        sys.stdout.write(block)
+        return []
+
+    root, ext = os.path.splitext(output_path)
+    extension = ext.lstrip(".") or "txt"
+    if os.path.dirname(output_path):
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    paths = []
+    for font in fonts:
+        # With more than one font, each font gets its own file named after it
+        font_path = output_path if len(fonts) == 1 else f"{root}_{font}"
+        font_path = append_file_extension(font_path, extension)
+        with open(font_path, "w") as file:
+            for line in lines:
+                for block in iter_render(line, font, width):
+                    file.write(block)
+        paths.append(font_path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Turn text into ASCII art. Runs interactively unless a font is given.")
+    parser.add_argument("-f", "--font", dest="fonts", action="append",
+                        help="font to render with, may be repeated to render in several fonts")
+    parser.add_argument("-i", "--input", default="-",
+                        help="file with one line of text to render per line, or - for stdin (default: -)")
+    parser.add_argument("-o", "--output",
+                        help="file to write to instead of stdout. With several fonts, the font name is added to each file name")
+    parser.add_argument("-w", "--width", type=int, default=UNLIMITED_WIDTH,
+                        help="wrap output at this many columns (default: no wrapping)")
+    parser.add_argument("--check-atlas", action="store_true",
+                        help="check that the glyph atlas renderer matches pyfiglet for every font, then exit")
+    parser.add_argument("--startup-time", action="store_true",
+                        help="print how long the script took to start up")
+    parser.add_argument("--timings", nargs="?", const="-", metavar="FILE",
+                        help="record how long finding fonts, loading them, rendering and printing take, and report it "
+                             "per font when the script exits, to FILE or stderr")
+    parser.add_argument("--cprofile", metavar="FILE",
+                        help="profile the run with cProfile and save the stats to FILE (implies --timings)")
+    args = parser.parse_args()
+
+    if args.timings is not None or args.cprofile is not None:
+        enable_instrumentation(args.timings or "-", args.cprofile)
+
+    if args.startup_time:
+        print(f"Startup took {(time.perf_counter() - START_TIME) * 1000:.1f} ms", file=sys.stderr)
+
+    if args.check_atlas:
+        fonts = args.fonts or get_font_catalog().names
+        mismatches = check_glyph_atlases(fonts)
+        for font, sample in mismatches:
+            print(f"Glyph atlas output differs from pyfiglet for font {font} with text {sample!r}")
+        print(f"Checked {len(fonts)} fonts, {len(mismatches)} mismatches.")
+        sys.exit(1 if mismatches else 0)
+
+    if not args.fonts:
+        interactive_session()
+        return
+
+    for font in args.fonts:
+        try:
+            font_cache.get(font)
+        except pyfiglet.FontNotFound:
+            parser.error(f"font not found: {font}")
+
+    if args.input == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(args.input) as file:
+            lines = file.read().splitlines()
+    lines = [line for line in lines if line.strip()]
+
+    for path in render_batch(lines, args.fonts, args.output, args.width):
+        print(f"The ASCII art has been saved to {path}.")
+
+
+if __name__ == "__main__":
+    main()
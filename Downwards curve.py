@@ -1,47 +1,19 @@
-import importlib
-import subprocess
-
-# A list of required packages
-required_packages = ["numpy", "matplotlib"]
-
-# Check if all required packages are installed, and install them if they are not
-for package in required_packages:
-    try:
-        importlib.import_module(package)
-    except ImportError:
-        print(f"Package {package} not found. Installing...")
-        subprocess.check_call(["pip", "install", package])
+import argparse
+import concurrent.futures
+import csv
+import io
+import json
+import math
+import os
 
 import numpy as np
-import matplotlib.pyplot as plt
-
-
-def bezier_curve(start_point, end_point, height, num_points=50):
-    p0 = (start_point[0] + (end_point[0] - start_point[0])/3,
-          start_point[1] + (end_point[1] - start_point[1])/3,
-          start_point[2] + height)
-    p1 = (end_point[0] - (end_point[0] - start_point[0])/3,
-          end_point[1] - (end_point[1] - start_point[1])/3,
-          start_point[2] + height)
 
-    # Calculate points on the curve
-    curve_points = []
-    for i in range(num_points):
-        t = i / (num_points - 1)
-        x = (1 - t)**3 * start_point[0] + 3 * t * (1 - t)**2 * p0[0] + 3 * t**2 * (1 - t) * p1[0] + t**3 * end_point[0]
-        y = (1 - t)**3 * start_point[1] + 3 * t * (1 - t)**2 * p0[1] + 3 * t**2 * (1 - t) * p1[1] + t**3 * end_point[1]
-        z = (1 - t)**3 * start_point[2] + 3 * t * (1 - t)**2 * p0[2] + 3 * t**2 * (1 - t) * p1[2] + t**3 * end_point[2]
-        curve_points.append((x, y, z))
-
-    # Convert to NumPy array for slicing
-    curve_points = np.array(curve_points)
-
-    return curve_points
+from curve_math import bezier_curve, save_bezier_curve_npy
 
 
 # Sets up the plot
-def set_plot_parameters(start_point, end_point, height, start_marker, end_marker, ax, plt, num_points=50):
-    curve_points = bezier_curve(start_point, end_point, height, num_points)
+def set_plot_parameters(start_point, end_point, height, start_marker, end_marker, ax, plt, num_points=50, tolerance=None):
+    curve_points = bezier_curve(start_point, end_point, height, num_points, tolerance)
     ax.scatter(start_point[0], start_point[1], start_point[2], marker=start_marker, s=100)
     ax.scatter(end_point[0], end_point[1], end_point[2], marker=end_marker, s=100)
     ax.plot((start_point[0], end_point[0]), (start_point[1], end_point[1]), start_point[2] + height)
@@ -53,86 +25,398 @@ def set_plot_parameters(start_point, end_point, height, start_marker, end_marker
     plt.pause(0.001)
 
 
-# Input values
-start_point = np.array([0, 0, 0])
-end_point = np.array([10, 10, 0])
-height = 65
-num_points = 50
-
-# Define markers for start point, end point, and vertex
-start_marker = 'o'
-end_marker = '^'
-
-# Create 3D plot
-fig = plt.figure()
-ax = fig.add_subplot(111, projection='3d')
-vertex_point = set_plot_parameters(start_point, end_point, height, start_marker, end_marker, ax, plt, num_points)
-
-# Allow user to change curve parameters
-while True:
-    # Get user input
-    print('\nCurrent parameters:')
-    print(f'  Start point: {start_point}')
-    print(f'  End point: {end_point}')
-    print(f'  Height: {height}')
-    print(f'  Points on curve: {num_points}')
-    print('\nSelect a parameter to change:')
-    print('  1: Start point')
-    print('  2: End point')
-    print('  3: Height')
-    print('  4: Points on curve')
-    print('  5: Change all parameters')
-    print('  6: No changes')
-    print('  7: Quit')
-    selection = input('> ')
-
-    # Change parameter based on user input
-    if selection == '1':
-        print('Enter new start point as "x y z":')
-        try:
-            x, y, z = [float(i) for i in input('> ').split()]
-            start_point = np.array([x, y, z])
-        except:
-            print('Invalid input. Please try again.')
-    elif selection == '2':
-        print('Enter new end point as "x y z":')
-        try:
-            x, y, z = [float(i) for i in input('> ').split()]
-            end_point = np.array([x, y, z])
-        except:
-            print('Invalid input. Please try again.')
-    elif selection == '3':
-        print('Enter new vertex height:')
-        try:
-            height = float(input('> '))
-        except:
-            print('Invalid input. Please try again.')
-    elif selection == '4':
-        print('Enter new number of points on curve to calculate:')
-        try:
-            num_points = int(input('> '))
-        except:
-            print('Invalid input. Please try again.')
-    elif selection == '5':
-        print('Enter new parameters as "start_x start_y start_z end_x end_y end_z height num_points":')
-        try:
-            start_x, start_y, start_z, end_x, end_y, end_z, height, num_points = [float(i) for i in input('> ').split()]
-            start_point = np.array([start_x, start_y, start_z])
-            end_point = np.array([end_x, end_y, end_z])
-        except:
-            print('Invalid input. Please try again.')
-    elif selection == '6':
-        print('No changes made.')
-    elif selection == '7':
-        break
+# Keeps the plot's artists alive between menu edits and only swaps their data,
+# instead of clearing the axes and rebuilding everything on every change
+class CurvePlot:
+    def __init__(self, ax, start_marker, end_marker, blit=False):
+        self.ax = ax
+        self.fig = ax.figure
+        self.start_marker = start_marker
+        self.end_marker = end_marker
+        self.blit = blit
+        self.artists = None
+        self.limits = None
+        self.background = None
+        self.shown = False
+
+        # Any full redraw (resizing, rotating the view) invalidates the saved background
+        if self.blit:
+            self.fig.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _create_artists(self, start_point, end_point, height, curve_points):
+        ax = self.ax
+        start_scatter = ax.scatter(start_point[0], start_point[1], start_point[2], marker=self.start_marker, s=100)
+        end_scatter = ax.scatter(end_point[0], end_point[1], end_point[2], marker=self.end_marker, s=100)
+        chord_line, = ax.plot((start_point[0], end_point[0]), (start_point[1], end_point[1]), start_point[2] + height)
+        curve_line, = ax.plot(curve_points[:,0], curve_points[:,1], curve_points[:,2])
+        ax.set_xlabel('X')
+        ax.set_ylabel('Y')
+        ax.set_zlabel('Z')
+
+        self.artists = (start_scatter, end_scatter, chord_line, curve_line)
+        for artist in self.artists:
+            artist.set_animated(self.blit)
+
+    def _set_artist_data(self, start_point, end_point, height, curve_points):
+        start_scatter, end_scatter, chord_line, curve_line = self.artists
+        # 3D scatters are moved by setting their x, y offsets and then their z values
+        start_scatter.set_offsets([start_point[:2]])
+        start_scatter.set_3d_properties([start_point[2]], 'z')
+        end_scatter.set_offsets([end_point[:2]])
+        end_scatter.set_3d_properties([end_point[2]], 'z')
+        chord_z = start_point[2] + height
+        chord_line.set_data_3d((start_point[0], end_point[0]), (start_point[1], end_point[1]), (chord_z, chord_z))
+        curve_line.set_data_3d(curve_points[:,0], curve_points[:,1], curve_points[:,2])
+
+    # Rescales the axes to the new data. Returns True if the limits actually moved.
+    def _update_limits(self, start_point, end_point, height, curve_points):
+        chord_z = start_point[2] + height
+        points = np.vstack((curve_points, [start_point, end_point],
+                            [(start_point[0], start_point[1], chord_z), (end_point[0], end_point[1], chord_z)]))
+        limits = (points.min(axis=0).tolist(), points.max(axis=0).tolist())
+        if limits == self.limits:
+            return False
+        self.limits = limits
+        self.ax.auto_scale_xyz(points[:,0], points[:,1], points[:,2], had_data=False)
+        return True
+
+    def _on_draw(self, event):
+        self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        # The window can be drawn before the first curve is set
+        if self.artists is not None:
+            self._draw_artists()
+
+    def _draw_artists(self):
+        for artist in self.artists:
+            self.ax.draw_artist(artist)
+
+    # Points the artists at a new curve without drawing anything.
+    # Returns the curve points and whether the axes limits moved.
+    def set_data(self, start_point, end_point, height, num_points=50, tolerance=None):
+        curve_points = bezier_curve(start_point, end_point, height, num_points, tolerance)
+
+        if self.artists is None:
+            self._create_artists(start_point, end_point, height, curve_points)
+        else:
+            self._set_artist_data(start_point, end_point, height, curve_points)
+        limits_changed = self._update_limits(start_point, end_point, height, curve_points)
+
+        return curve_points, limits_changed
+
+    def update(self, start_point, end_point, height, num_points=50, tolerance=None):
+        curve_points, limits_changed = self.set_data(start_point, end_point, height, num_points, tolerance)
+
+        if not self.blit:
+            import matplotlib.pyplot as plt
+            plt.draw()
+            plt.pause(0.001)
+            return
+
+        # The window has to be open before anything can be blitted to it
+        if not self.shown:
+            import matplotlib.pyplot as plt
+            plt.show(block=False)
+            self.shown = True
+
+        # Only the curve artists changed, so paint them over the saved background
+        canvas = self.fig.canvas
+        if limits_changed or self.background is None:
+            canvas.draw()
+        else:
+            canvas.restore_region(self.background)
+            self._draw_artists()
+        canvas.blit(self.fig.bbox)
+        canvas.flush_events()
+
+
+# Columns expected in a CSV parameter file. tolerance and name are optional.
+CSV_COLUMNS = ["start_x", "start_y", "start_z", "end_x", "end_y", "end_z", "height", "num_points"]
+
+
+# Reads curve specifications from a CSV or JSON parameter file.
+# JSON files hold a list of objects like {"start": [x, y, z], "end": [x, y, z], "height": h, "num_points": n}.
+def load_curve_specs(path):
+    specs = []
+    if os.path.splitext(path)[1].lower() == ".json":
+        with open(path) as file:
+            for row in json.load(file):
+                specs.append({
+                    "start_point": np.array(row["start"], dtype=float),
+                    "end_point": np.array(row["end"], dtype=float),
+                    "height": float(row["height"]),
+                    "num_points": int(row.get("num_points", 50)),
+                    "tolerance": float(row["tolerance"]) if row.get("tolerance") else None,
+                    "name": row.get("name"),
+                })
     else:
-        print('Invalid selection. Please try again.')
-        continue
+        with open(path, newline="") as file:
+            reader = csv.DictReader(file)
+            missing = [column for column in CSV_COLUMNS if column not in (reader.fieldnames or [])]
+            if missing:
+                raise ValueError(f"{path} is missing columns: {', '.join(missing)}")
+            for row in reader:
+                specs.append({
+                    "start_point": np.array([float(row[c]) for c in ("start_x", "start_y", "start_z")]),
+                    "end_point": np.array([float(row[c]) for c in ("end_x", "end_y", "end_z")]),
+                    "height": float(row["height"]),
+                    "num_points": int(float(row["num_points"])),
+                    "tolerance": float(row["tolerance"]) if row.get("tolerance") else None,
+                    "name": row.get("name") or None,
+                })
+
+    for i, spec in enumerate(specs):
+        if not spec["name"]:
+            spec["name"] = f"curve_{i:05d}"
+    return specs
+
+
+# Creates an off-screen figure drawn by Agg, so no GUI or display is needed
+def create_headless_figure():
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111, projection='3d')
+    return fig, ax
+
+
+# Renders one curve specification to image files (and a .npy of its points) in output_dir.
+# Pass in the same CurvePlot to reuse its figure between curves.
+def render_curve_to_files(spec, output_dir, curve_plot, formats=("png",), save_points=True):
+    curve_points, _ = curve_plot.set_data(spec["start_point"], spec["end_point"], spec["height"],
+                                          spec["num_points"], spec["tolerance"])
+    paths = []
+    for image_format in formats:
+        path = os.path.join(output_dir, f"{spec['name']}.{image_format}")
+        curve_plot.fig.savefig(path, format=image_format)
+        paths.append(path)
+    if save_points:
+        path = os.path.join(output_dir, f"{spec['name']}.npy")
+        np.save(path, curve_points)
+        paths.append(path)
+    return paths
 
-    if plt.fignum_exists(fig.number):
-        ax.clear()
+
+# Renders one curve specification in memory, returning the file contents keyed by extension
+def render_curve_to_bytes(spec, curve_plot, formats=("png",), save_points=True):
+    curve_points, _ = curve_plot.set_data(spec["start_point"], spec["end_point"], spec["height"],
+                                          spec["num_points"], spec["tolerance"])
+    files = {}
+    for image_format in formats:
+        buffer = io.BytesIO()
+        curve_plot.fig.savefig(buffer, format=image_format)
+        files[image_format] = buffer.getvalue()
+    if save_points:
+        buffer = io.BytesIO()
+        np.save(buffer, curve_points)
+        files["npy"] = buffer.getvalue()
+    return files
+
+
+# Renders every specification without a GUI, reusing a single figure
+def run_batch(specs, output_dir, formats=("png",), save_points=True, start_marker='o', end_marker='^'):
+    os.makedirs(output_dir, exist_ok=True)
+    fig, ax = create_headless_figure()
+    curve_plot = CurvePlot(ax, start_marker, end_marker)
+
+    paths = []
+    for spec in specs:
+        paths.extend(render_curve_to_files(spec, output_dir, curve_plot, formats, save_points))
+    return paths
+
+
+# Writes each curve's points to a .npy file without rendering anything.
+# Uniformly sampled curves are streamed in chunks, so num_points can be far larger than RAM allows.
+def export_points(specs, output_dir, chunk_size=1_000_000, dtype=np.float64):
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for spec in specs:
+        path = os.path.join(output_dir, f"{spec['name']}.npy")
+        if spec["tolerance"]:
+            curve_points = bezier_curve(spec["start_point"], spec["end_point"], spec["height"],
+                                        tolerance=spec["tolerance"])
+            np.save(path, curve_points.astype(dtype, copy=False))
+        else:
+            save_bezier_curve_npy(path, spec["start_point"], spec["end_point"], spec["height"],
+                                  spec["num_points"], chunk_size, dtype)
+        paths.append(path)
+    return paths
+
+
+# Each render worker process keeps its own figure and reuses it for every job it is given
+_worker_curve_plot = None
+
+
+def _init_render_worker(start_marker, end_marker):
+    global _worker_curve_plot
+    fig, ax = create_headless_figure()
+    _worker_curve_plot = CurvePlot(ax, start_marker, end_marker)
+
+
+def _render_job(job):
+    spec, output_dir, formats, save_points = job
+    if output_dir is None:
+        return spec["name"], render_curve_to_bytes(spec, _worker_curve_plot, formats, save_points)
+    return spec["name"], render_curve_to_files(spec, output_dir, _worker_curve_plot, formats, save_points)
+
+
+# Shards the specifications across a pool of worker processes and yields (name, result) pairs
+# in input order as they finish. The result is a list of written paths when output_dir is given,
+# otherwise a dict of in-memory file contents keyed by extension.
+# By default each worker gets about four chunks of jobs, so every core has work however many curves there are.
+def parallel_render(specs, output_dir=None, formats=("png",), save_points=True, workers=None, chunksize=None,
+                    start_marker='o', end_marker='^'):
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+
+    jobs = [(spec, output_dir, tuple(formats), save_points) for spec in specs]
+    if chunksize is None:
+        chunksize = max(1, len(jobs) // ((workers or os.cpu_count() or 1) * 4))
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_render_worker,
+                                                initargs=(start_marker, end_marker)) as executor:
+        yield from executor.map(_render_job, jobs, chunksize=chunksize)
+
+
+# Opens the interactive plot window and its parameter menu
+def interactive_menu(blit=False):
+    import matplotlib.pyplot as plt
+
+    # Input values
+    start_point = np.array([0, 0, 0])
+    end_point = np.array([10, 10, 0])
+    height = 65
+    num_points = 50
+    tolerance = None
+
+    # Define markers for start point, end point, and vertex
+    start_marker = 'o'
+    end_marker = '^'
+
+    # Create 3D plot
+    fig = plt.figure()
+    ax = fig.add_subplot(111, projection='3d')
+    curve_plot = CurvePlot(ax, start_marker, end_marker, blit)
+    curve_plot.update(start_point, end_point, height, num_points, tolerance)
+
+    # Allow user to change curve parameters
+    while True:
+        # Get user input
+        print('\nCurrent parameters:')
+        print(f'  Start point: {start_point}')
+        print(f'  End point: {end_point}')
+        print(f'  Height: {height}')
+        print(f'  Points on curve: {num_points}')
+        print(f'  Sampling tolerance: {tolerance if tolerance else "off (uniform sampling)"}')
+        print('\nSelect a parameter to change:')
+        print('  1: Start point')
+        print('  2: End point')
+        print('  3: Height')
+        print('  4: Points on curve')
+        print('  5: Change all parameters')
+        print('  6: No changes')
+        print('  7: Quit')
+        print('  8: Sampling tolerance')
+        selection = input('> ')
+
+        # Change parameter based on user input
+        if selection == '1':
+            print('Enter new start point as "x y z":')
+            try:
+                x, y, z = [float(i) for i in input('> ').split()]
+                start_point = np.array([x, y, z])
+            except:
+                print('Invalid input. Please try again.')
+        elif selection == '2':
+            print('Enter new end point as "x y z":')
+            try:
+                x, y, z = [float(i) for i in input('> ').split()]
+                end_point = np.array([x, y, z])
+            except:
+                print('Invalid input. Please try again.')
+        elif selection == '3':
+            print('Enter new vertex height:')
+            try:
+                height = float(input('> '))
+            except:
+                print('Invalid input. Please try again.')
+        elif selection == '4':
+            print('Enter new number of points on curve to calculate:')
+            try:
+                num_points = int(input('> '))
+            except:
+                print('Invalid input. Please try again.')
+        elif selection == '5':
+            print('Enter new parameters as "start_x start_y start_z end_x end_y end_z height num_points":')
+            try:
+                start_x, start_y, start_z, end_x, end_y, end_z, height, num_points = [float(i) for i in input('> ').split()]
+                start_point = np.array([start_x, start_y, start_z])
+                end_point = np.array([end_x, end_y, end_z])
+            except:
+                print('Invalid input. Please try again.')
+        elif selection == '6':
+            print('No changes made.')
+        elif selection == '7':
+            break
+        elif selection == '8':
+            print('Enter a chordal tolerance for adaptive sampling, or 0 to sample uniformly:')
+            try:
+                value = float(input('> '))
+                if not (value >= 0 and math.isfinite(value)):
+                    raise ValueError
+                tolerance = value
+            except:
+                print('Invalid input. Please try again.')
+        else:
+            print('Invalid selection. Please try again.')
+            continue
+
+        if not plt.fignum_exists(fig.number):
+            fig = plt.figure()
+            ax = fig.add_subplot(111, projection='3d')
+            curve_plot = CurvePlot(ax, start_marker, end_marker, blit)
+
+        curve_plot.update(start_point, end_point, height, num_points, tolerance)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plot downwards Bezier curves interactively, or render them in bulk.")
+    parser.add_argument("--batch", metavar="PARAMETER_FILE",
+                        help="CSV or JSON file of curves to render headlessly instead of opening the interactive menu")
+    parser.add_argument("--output-dir", default="curves", help="directory to write rendered curves to (default: curves)")
+    parser.add_argument("--format", dest="formats", action="append", choices=["png", "svg"],
+                        help="image format to write, may be repeated (default: png)")
+    parser.add_argument("--no-points", action="store_true", help="don't write each curve's points to a .npy file")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of render processes, 0 for one per CPU core (default: 1)")
+    parser.add_argument("--points-only", action="store_true",
+                        help="skip rendering and stream each curve's points to a .npy file in chunks")
+    parser.add_argument("--dtype", choices=["float32", "float64"], default="float64",
+                        help="point precision used with --points-only (default: float64)")
+    parser.add_argument("--chunk-size", type=int, default=1_000_000,
+                        help="points computed at a time with --points-only (default: 1000000)")
+    parser.add_argument("--blit", action="store_true",
+                        help="in the interactive menu, redraw only the curve on top of a saved background "
+                             "instead of the whole figure")
+    args = parser.parse_args()
+
+    if args.batch is None:
+        interactive_menu(args.blit)
+        return
+
+    specs = load_curve_specs(args.batch)
+    formats = args.formats or ["png"]
+    if args.points_only:
+        paths = export_points(specs, args.output_dir, args.chunk_size, np.dtype(args.dtype))
+    elif args.workers == 1:
+        paths = run_batch(specs, args.output_dir, formats, not args.no_points)
     else:
-        fig = plt.figure()
-        ax = fig.add_subplot(111, projection='3d')
+        paths = []
+        for _, curve_paths in parallel_render(specs, args.output_dir, formats, not args.no_points,
+                                              workers=args.workers or os.cpu_count()):
+            paths.extend(curve_paths)
+    print(f"{'Exported' if args.points_only else 'Rendered'} {len(specs)} curves to {len(paths)} files in {args.output_dir}")
+
 
-    set_plot_parameters(start_point, end_point, height, start_marker, end_marker, ax, plt, num_points)
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
 # Import pygame module
 import pygame
 
+# Import the renderer that only redraws the parts of the screen that change
+from dirty_rects import DirtyRectRenderer
+
 # Initialize pygame
 pygame.init()
 
@@ -61,19 +64,13 @@ dash_timer = 0  # The timer for dash cooldown
 # Create a clock object to control the frame rate
 clock = pygame.time.Clock()
 
+# Create a renderer that erases and redraws only where the character was and is
+renderer = DirtyRectRenderer(screen)
+
 # Create a loop for the main game logic
 running = True
 while running:
 
-    # Fill the screen with black color
-    screen.fill((0, 0, 0))
-
-    # Draw the character on the screen
-    screen.blit(character_sprite, character_rect)
-
-    # Update the display
-    pygame.display.flip()
-
     # Handle events
     for event in pygame.event.get():
 
@@ -251,11 +248,14 @@ while running:
         ## This will stop the falling motion when the character reaches the ground
         is_falling = False
 
+    ## Erase the character from where it was drawn last frame
+    renderer.erase()
+
     ## Draw the character sprite on the screen at its current position
-    screen.blit(character_sprite, character_rect)
+    renderer.blit(character_sprite, character_rect)
 
-    ## Update the display
-    pygame.display.update()
+    ## Update only the parts of the display that changed
+    renderer.present()
 
     ## Wait for 1/60 seconds
     clock.tick(60)
@@ -1,5 +1,7 @@
 import pygame
+import numpy as np
 from collections import deque
+from dirty_rects import DirtyRectRenderer
 
 # initialize Pygame
 pygame.init()
@@ -12,6 +14,16 @@ WINDOW_HEIGHT = window.get_height()
 # set up clock
 clock = pygame.time.Clock()
 
+# only the areas the player moves over are redrawn each frame
+renderer = DirtyRectRenderer(window)
+
+# physics runs in fixed steps at this rate no matter how fast frames are drawn.
+# speeds, gravity and CLIMB_DURATION are tuned per 1/60 of a second and scaled to the step length
+PHYSICS_HZ = 60
+FRAME_RATE = 60
+# most physics steps run in one frame when catching up, so a slow frame can't stall the game
+MAX_CATCH_UP_STEPS = 5
+
 # load player sprites
 player_sprite_paths = [
     # "player_idle.png",
@@ -27,260 +39,491 @@ player_sprite_paths = [
     "character.png",
     "character.png"
 ]
-player_sprites = []
 scale = 10
-for sprite_path in player_sprite_paths:
-    sprite = pygame.image.load(sprite_path).convert_alpha()
-    original_width, original_height = sprite.get_size()
-    aspect_ratio = original_width / original_height
-    new_width = int(WINDOW_HEIGHT / scale * aspect_ratio)
-    new_height = int(WINDOW_HEIGHT / scale)
-    sprite = pygame.transform.scale(sprite, (new_width, new_height))
-    player_sprites.append(sprite)
-
-# variable dictionary easily passed to any function
-vd = {
-    "TIME_TOTAL": 0,
-    "TIME_DELTA": 0,
-    "GAME_RUNNING": True,
-    "WINDOW_WIDTH": WINDOW_WIDTH,
-    "WINDOW_HEIGHT": WINDOW_HEIGHT,
-    "WINDOW_SCALE_X": WINDOW_WIDTH / 640,
-    "WINDOW_SCALE_Y": WINDOW_HEIGHT / 480,
-    "GAME_SCALE": scale,
-    "PLAYER_WIDTH": 32,
-    "PLAYER_HEIGHT": 32,
-    "GRAVITY": 2.8,
-    "WALK_SPEED": 35,
-    "JUMP_VELOCITY": 70,
-    "DASH_SPEED": 77,
-    "DASH_DURATION": 0.2,
-    "DASH_COOLDOWN": 0.1,
-    "CLIMB_SPEED": 21,
-    "CLIMB_DURATION": 30,
-    "player_rect": player_sprites[0].get_rect(),
-    "player_spawn": (0, 0),
-    "player_x_velocity": 0,
-    "player_y_velocity": 0,
-    "player_on_ground": False,
-    "player_jumping": False,
-    "player_wall_climbing": False,
-    "player_wall_climbing_direction": 0,
-    "player_wall_climb_timer": 0,
-    "player_dash_timer": 0,
-    "player_dash_available": True,
-    "player_double_jump_available": True,
-    "player_jump_after_dash": False,
-    "player_x_direction": 1,
-    "player_y_direction": 0,
-}
-
-
-def handle_timers(vd):
-    for timer_name in ["player_dash_timer", "player_wall_climb_timer"]:
-        if vd[timer_name] > 0:
-            vd[timer_name] -= vd["TIME_DELTA"]
-        else:
-            vd[timer_name] = 0
 
 
-def move_rect(rect: pygame.Rect, location: tuple):
-    rect.center = location
-
-
-# function for updating player position
-def update_player_position(vd):
-    # update player position based on velocities
-    if vd["player_dash_timer"] > vd["DASH_COOLDOWN"]:
-        vd["player_rect"].x += vd["player_x_direction"] * vd["DASH_SPEED"] * vd["WINDOW_SCALE_X"] / vd["GAME_SCALE"]
-        vd["player_y_velocity"] = 0
-    else:
-        vd["player_rect"].x += vd["player_x_velocity"] * vd["WINDOW_SCALE_X"] / vd["GAME_SCALE"]
-        vd["player_rect"].y += vd["player_y_velocity"] * vd["WINDOW_SCALE_Y"] / vd["GAME_SCALE"]
-
-    # apply gravity to player velocity
-    vd["player_y_velocity"] += vd["GRAVITY"]
-
-    # check if player is on ground
-    if vd["player_rect"].bottom >= vd["WINDOW_HEIGHT"]:
-        vd["player_rect"].bottom = vd["WINDOW_HEIGHT"]
-        vd["player_on_ground"] = True
-        vd["player_y_velocity"] = 0
-
-    # check if player is wall climbing
-    if vd["player_wall_climbing"]:
-        if vd["player_wall_climb_timer"] > 0:
-            vd["player_wall_climb_timer"] -= 1
-        else:
-            vd["player_wall_climbing"] = False
-            vd["player_x_velocity"] = vd["player_wall_climbing_direction"] * vd["WALK_SPEED"]
-
-    # check for collision with walls
-    wall_rects = [pygame.Rect(0, 0, 20, vd["WINDOW_HEIGHT"]), pygame.Rect(
-        vd["WINDOW_WIDTH"] - 20, 0, 20, vd["WINDOW_HEIGHT"])]
-    for wall_rect in wall_rects:
-        if vd["player_rect"].colliderect(wall_rect):
-            # check if player is climbing wall
-            if vd["player_wall_climbing"]:
-                vd["player_y_velocity"] = 0
-                if vd["player_rect"].left < wall_rect.left:
-                    vd["player_rect"].left = wall_rect.left - vd["PLAYER_WIDTH"]
-                else:
-                    vd["player_rect"].right = wall_rect.right + vd["PLAYER_WIDTH"]
-            else:
-                # stop player's horizontal movement
-                if vd["player_x_velocity"] > 0:
-                    vd["player_rect"].right = wall_rect.left
-                else:
-                    vd["player_rect"].left = wall_rect.right
-                vd["player_x_velocity"] = 0
+# every frame of a set of sprites, scaled and mirrored ahead of time and packed into one sheet.
+# each image file is loaded once, and frames that use the same file share their place on the sheet.
+# the top row of the sheet holds the frames facing right, the bottom row the same frames mirrored.
+class SpriteAtlas:
+    def __init__(self, paths, height):
+        self.paths = paths
+        self.images = {}
+        for path in paths:
+            if path not in self.images:
+                self.images[path] = pygame.image.load(path).convert_alpha()
+        self.build(height)
+
+    # scales every image to the given height, keeping its aspect ratio, and packs them into the sheet
+    def build(self, height):
+        scaled = {}
+        for path, image in self.images.items():
+            original_width, original_height = image.get_size()
+            aspect_ratio = original_width / original_height
+            scaled[path] = pygame.transform.scale(image, (int(height * aspect_ratio), height))
+
+        self.sheet = pygame.Surface((sum(image.get_width() for image in scaled.values()), height * 2),
+                                    pygame.SRCALPHA).convert_alpha()
+        areas = {}
+        x = 0
+        for path, image in scaled.items():
+            width = image.get_width()
+            self.sheet.blit(image, (x, 0))
+            self.sheet.blit(pygame.transform.flip(image, True, False), (x, height))
+            areas[path] = (pygame.Rect(x, 0, width, height), pygame.Rect(x, height, width, height))
+            x += width
+
+        # (facing right, mirrored) areas of the sheet for each frame index
+        self.frames = [areas[path] for path in self.paths]
+        self.frame_size = self.frames[0][0].size
+
+    def draw(self, surface, index, position, mirrored=False):
+        surface.blit(self.sheet, position, self.frames[index][mirrored])
+
+
+player_atlas = SpriteAtlas(player_sprite_paths, int(WINDOW_HEIGHT / scale))
+
+# game settings
+TIME_DELTA = 1 / PHYSICS_HZ
+STEP_SCALE = 60 / PHYSICS_HZ
+WINDOW_SCALE_X = WINDOW_WIDTH / 640
+WINDOW_SCALE_Y = WINDOW_HEIGHT / 480
+GAME_SCALE = scale
+PLAYER_WIDTH = 32
+PLAYER_HEIGHT = 32
+GRAVITY = 2.8
+WALK_SPEED = 35
+JUMP_VELOCITY = 70
+DASH_SPEED = 77
+DASH_DURATION = 0.2
+DASH_COOLDOWN = 0.1
+CLIMB_SPEED = 21
+CLIMB_DURATION = 30
+
+# how far a velocity of 1 moves an entity in one physics step
+STEP_DISTANCE_X = WINDOW_SCALE_X / GAME_SCALE * STEP_SCALE
+STEP_DISTANCE_Y = WINDOW_SCALE_Y / GAME_SCALE * STEP_SCALE
+
+time_accumulator = 0
+game_running = True
+
+
+# state of every entity, one contiguous array per field, so all entities can be updated at once
+class EntityStore:
+    FIELDS = {
+        "x": np.float64,
+        "y": np.float64,
+        "previous_x": np.float64,
+        "previous_y": np.float64,
+        "width": np.int32,
+        "height": np.int32,
+        "x_velocity": np.float64,
+        "y_velocity": np.float64,
+        "x_direction": np.int8,
+        "dash_timer": np.float64,
+        "wall_climb_timer": np.float64,
+        "wall_climbing_direction": np.int8,
+        "on_ground": np.bool_,
+        "jumping": np.bool_,
+        "wall_climbing": np.bool_,
+        "dash_available": np.bool_,
+        "double_jump_available": np.bool_,
+        "jump_after_dash": np.bool_,
+    }
+
+    def __init__(self, capacity=16):
+        self.count = 0
+        self.capacity = capacity
+        for name, dtype in self.FIELDS.items():
+            setattr(self, name, np.zeros(capacity, dtype))
+
+    # adds an entity with its top left corner at (x, y) and returns its index
+    def add(self, x, y, width, height):
+        if self.count == self.capacity:
+            self.capacity *= 2
+            for name in self.FIELDS:
+                array = getattr(self, name)
+                grown = np.zeros(self.capacity, array.dtype)
+                grown[:self.count] = array
+                setattr(self, name, grown)
+
+        index = self.count
+        self.count += 1
+        for name in self.FIELDS:
+            getattr(self, name)[index] = 0
+        self.x[index] = self.previous_x[index] = x
+        self.y[index] = self.previous_y[index] = y
+        self.width[index] = width
+        self.height[index] = height
+        self.x_direction[index] = 1
+        self.dash_available[index] = True
+        self.double_jump_available[index] = True
+        return index
+
+
+# a single entity in an EntityStore, with its fields as plain attributes.
+# load() copies the entity's fields out of the store and save() writes them back, so code that reads
+# and writes one entity many times per step works on Python values instead of indexing arrays each time
+class Entity:
+    __slots__ = ("store", "index") + tuple(EntityStore.FIELDS)
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+        self.load()
+
+    def load(self):
+        store = self.store
+        index = self.index
+        for name in EntityStore.FIELDS:
+            setattr(self, name, getattr(store, name).item(index))
+
+    def save(self):
+        store = self.store
+        index = self.index
+        for name in EntityStore.FIELDS:
+            getattr(store, name)[index] = getattr(self, name)
+
+    @property
+    def rect(self):
+        return pygame.Rect(round(self.x), round(self.y), self.width, self.height)
+
+    def center_on(self, location):
+        self.x = location[0] - self.width / 2
+        self.y = location[1] - self.height / 2
+
+
+entities = EntityStore()
+player = Entity(entities, entities.add(0, 0, *player_atlas.frame_size))
+
+# solid level geometry, built once at load
+wall_rects = [pygame.Rect(0, 0, 20, WINDOW_HEIGHT), pygame.Rect(WINDOW_WIDTH - 20, 0, 20, WINDOW_HEIGHT)]
+
+
+# a uniform grid over the level's solid rects, for finding which solids a rect overlaps without testing every one.
+# each cell lists the solids that touch it, stored as one flat array with the start of each cell's list
+class CollisionGrid:
+    def __init__(self, solids, cell_size=64):
+        self.solids = solids
+        self.cell_size = cell_size
+        self.lefts = np.array([solid.left for solid in solids], np.int64)
+        self.tops = np.array([solid.top for solid in solids], np.int64)
+        self.rights = np.array([solid.right for solid in solids], np.int64)
+        self.bottoms = np.array([solid.bottom for solid in solids], np.int64)
+
+        self.origin_x = int(self.lefts.min(initial=0))
+        self.origin_y = int(self.tops.min(initial=0))
+        self.columns = (int(self.rights.max(initial=1)) - self.origin_x - 1) // cell_size + 1
+        self.rows = (int(self.bottoms.max(initial=1)) - self.origin_y - 1) // cell_size + 1
+
+        cells, solid_ids = self._cells(self.lefts, self.tops, self.rights, self.bottoms)
+        order = np.argsort(cells, kind="stable")
+        self.cell_solids = solid_ids[order]
+        self.cell_starts = np.searchsorted(cells[order], np.arange(self.columns * self.rows + 1))
+
+        # the same lists as Python lists, for looking up one rect at a time without numpy's overhead
+        self.cell_lists = [self.cell_solids[start:end].tolist()
+                           for start, end in zip(self.cell_starts[:-1], self.cell_starts[1:])]
+
+    # every (cell, rect index) pair for the cells each rect touches, clamped to the grid
+    def _cells(self, lefts, tops, rights, bottoms):
+        first_x = np.clip((lefts - self.origin_x) // self.cell_size, 0, self.columns - 1)
+        last_x = np.clip((rights - 1 - self.origin_x) // self.cell_size, first_x, self.columns - 1)
+        first_y = np.clip((tops - self.origin_y) // self.cell_size, 0, self.rows - 1)
+        last_y = np.clip((bottoms - 1 - self.origin_y) // self.cell_size, first_y, self.rows - 1)
+
+        widths = last_x - first_x + 1
+        counts = widths * (last_y - first_y + 1)
+        ids = np.repeat(np.arange(len(lefts)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        cells = (first_y[ids] + offsets // widths[ids]) * self.columns + first_x[ids] + offsets % widths[ids]
+        return cells, ids
+
+    # (rect index, solid index) pairs for every solid each rect overlaps, ordered by solid
+    def overlapping(self, lefts, tops, rights, bottoms):
+        lefts, tops, rights, bottoms = (np.asarray(edges, np.int64) for edges in (lefts, tops, rights, bottoms))
+        cells, rect_ids = self._cells(lefts, tops, rights, bottoms)
+        counts = self.cell_starts[cells + 1] - self.cell_starts[cells]
+        rect_ids = np.repeat(rect_ids, counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        solid_ids = self.cell_solids[np.repeat(self.cell_starts[cells], counts) + offsets]
+
+        # a rect and a solid can share several cells
+        pairs = np.unique(solid_ids * len(lefts) + rect_ids)
+        solid_ids, rect_ids = np.divmod(pairs, len(lefts))
+        overlap = ((lefts[rect_ids] < self.rights[solid_ids]) & (rights[rect_ids] > self.lefts[solid_ids])
+                   & (tops[rect_ids] < self.bottoms[solid_ids]) & (bottoms[rect_ids] > self.tops[solid_ids]))
+        return rect_ids[overlap], solid_ids[overlap]
+
+    # the solids a rect overlaps
+    def query(self, rect):
+        cell_size = self.cell_size
+        first_x = min(max((rect.left - self.origin_x) // cell_size, 0), self.columns - 1)
+        last_x = min(max((rect.right - 1 - self.origin_x) // cell_size, first_x), self.columns - 1)
+        first_y = min(max((rect.top - self.origin_y) // cell_size, 0), self.rows - 1)
+        last_y = min(max((rect.bottom - 1 - self.origin_y) // cell_size, first_y), self.rows - 1)
+
+        solid_ids = set()
+        for row in range(first_y, last_y + 1):
+            for cell in range(row * self.columns + first_x, row * self.columns + last_x + 1):
+                solid_ids.update(self.cell_lists[cell])
+        return [self.solids[solid_id] for solid_id in sorted(solid_ids) if rect.colliderect(self.solids[solid_id])]
+
+    # the solids a rect overlaps anywhere along a move by (dx, dy)
+    def query_swept(self, rect, dx, dy):
+        return self.query(rect.union(rect.move(dx, dy)))
+
+
+level_grid = CollisionGrid(wall_rects)
+
+
+def handle_timers(entities):
+    n = entities.count
+    for timer in [entities.dash_timer[:n], entities.wall_climb_timer[:n]]:
+        timer[:] = np.where(timer > 0, timer - TIME_DELTA, 0)
+
+
+# function for updating the positions of every entity at once
+def update_entity_positions(entities):
+    n = entities.count
+    x = entities.x[:n]
+    y = entities.y[:n]
+    x_velocity = entities.x_velocity[:n]
+    y_velocity = entities.y_velocity[:n]
+    wall_climbing = entities.wall_climbing[:n]
+    wall_climb_timer = entities.wall_climb_timer[:n]
+
+    # update positions based on velocities
+    dashing = entities.dash_timer[:n] > DASH_COOLDOWN
+    x += np.where(dashing, entities.x_direction[:n] * DASH_SPEED, x_velocity) * STEP_DISTANCE_X
+    y += np.where(dashing, 0, y_velocity) * STEP_DISTANCE_Y
+    y_velocity[dashing] = 0
+
+    # apply gravity to velocities
+    y_velocity += GRAVITY * STEP_SCALE
+
+    # check if entities are on ground
+    height = entities.height[:n]
+    grounded = np.rint(y) + height >= WINDOW_HEIGHT
+    y[grounded] = WINDOW_HEIGHT - height[grounded]
+    entities.on_ground[:n] |= grounded
+    y_velocity[grounded] = 0
+
+    # check if entities are wall climbing
+    climbing = wall_climbing & (wall_climb_timer > 0)
+    wall_climb_timer[climbing] -= STEP_SCALE
+    stopped = wall_climbing & ~climbing
+    wall_climbing[stopped] = False
+    x_velocity[stopped] = entities.wall_climbing_direction[:n][stopped] * WALK_SPEED
+
+    # check for collision with walls, finding the walls near each entity's path this step
+    width = entities.width[:n]
+    left = np.rint(x)
+    top = np.rint(y)
+    previous_x = entities.previous_x[:n]
+    previous_y = entities.previous_y[:n]
+    nearby, wall_ids = level_grid.overlapping(np.minimum(left, previous_x), np.minimum(top, previous_y),
+                                              np.maximum(left, previous_x) + width,
+                                              np.maximum(top, previous_y) + height)
+    walls, starts = np.unique(wall_ids, return_index=True)
+    for wall_id, group in zip(walls, np.split(nearby, starts[1:])):
+        wall_rect = level_grid.solids[wall_id]
+        left = np.rint(x)
+        top = np.rint(y)
+        colliding = np.zeros(n, bool)
+        colliding[group] = ((left[group] < wall_rect.right) & (left[group] + width[group] > wall_rect.left)
+                            & (top[group] < wall_rect.bottom) & (top[group] + height[group] > wall_rect.top))
+
+        # climbing entities stop falling and are pushed off the wall
+        climbing = colliding & wall_climbing
+        y_velocity[climbing] = 0
+        x[climbing] = np.where(left[climbing] < wall_rect.left, wall_rect.left - PLAYER_WIDTH,
+                               wall_rect.right + PLAYER_WIDTH - width[climbing])
+
+        # other entities stop moving horizontally
+        blocked = colliding & ~wall_climbing
+        x[blocked] = np.where(x_velocity[blocked] > 0, wall_rect.left - width[blocked], wall_rect.right)
+        x_velocity[blocked] = 0
 
 
 # function for handling player input
-def handle_player_input(vd):
+def handle_player_input(player):
+    global game_running
+
     # get keyboard input
     keys = pygame.key.get_pressed()
 
     # quit game
     if keys[pygame.K_ESCAPE]:
-        vd["GAME_RUNNING"] = False
+        game_running = False
 
     # handle stage reset
     if keys[pygame.K_r]:
-        move_rect(vd["player_rect"], (0, 30))
-        vd["player_x_velocity"] = vd["player_y_velocity"] = vd["player_dash_timer"] = 0
-        vd["player_dash_available"] = True
+        player.center_on((0, 30))
+        player.x_velocity = player.y_velocity = player.dash_timer = 0
+        player.dash_available = True
 
     # handle left and right movement
-    if vd["player_dash_timer"] < vd["DASH_COOLDOWN"]:
+    if player.dash_timer < DASH_COOLDOWN:
         if keys[pygame.K_LEFT]:
-            vd["player_x_velocity"] = -vd["WALK_SPEED"]
-            vd["player_x_direction"] = -1
+            player.x_velocity = -WALK_SPEED
+            player.x_direction = -1
         elif keys[pygame.K_RIGHT]:
-            vd["player_x_velocity"] = vd["WALK_SPEED"]
-            vd["player_x_direction"] = 1
+            player.x_velocity = WALK_SPEED
+            player.x_direction = 1
         else:
-            vd["player_x_velocity"] = 0
+            player.x_velocity = 0
 
     # handle jumping and dashing detections
-    if vd["player_y_velocity"] >= -3:
-        vd["player_jumping"] = False
+    if player.y_velocity >= -3:
+        player.jumping = False
 
-    if vd["player_on_ground"]:
-        vd["player_dash_available"] = True
-        vd["player_double_jump_available"] = True
+    if player.on_ground:
+        player.dash_available = True
+        player.double_jump_available = True
 
     # handle jumping
-    if keys[pygame.K_SPACE] and vd["player_on_ground"] and vd["player_dash_timer"] == 0:
-        vd["player_y_velocity"] = -vd["JUMP_VELOCITY"]
-        vd["player_on_ground"] = False
-        vd["player_jumping"] = True
+    if keys[pygame.K_SPACE] and player.on_ground and player.dash_timer == 0:
+        player.y_velocity = -JUMP_VELOCITY
+        player.on_ground = False
+        player.jumping = True
 
     # handle jumping if player jumped during dash
-    if keys[pygame.K_SPACE] and vd["player_dash_timer"] == 0 and vd["player_jump_after_dash"]:
-        if not vd["player_on_ground"]:
-            vd["player_double_jump_available"] = False
+    if keys[pygame.K_SPACE] and player.dash_timer == 0 and player.jump_after_dash:
+        if not player.on_ground:
+            player.double_jump_available = False
 
-        vd["player_y_velocity"] = -vd["JUMP_VELOCITY"]
-        vd["player_on_ground"] = False
-        vd["player_jumping"] = True
-        vd["player_jump_after_dash"] = False
+        player.y_velocity = -JUMP_VELOCITY
+        player.on_ground = False
+        player.jumping = True
+        player.jump_after_dash = False
 
     # letting go of space ends jump early
-    if not keys[pygame.K_SPACE] and vd["player_jumping"]:
-        vd["player_y_velocity"] = -2
-        vd["player_jumping"] = False
+    if not keys[pygame.K_SPACE] and player.jumping:
+        player.y_velocity = -2
+        player.jumping = False
 
     # handle dashing
-    if keys[pygame.K_LSHIFT] and vd["player_dash_available"]:
-        if vd["player_dash_timer"] == 0:
-            vd["player_dash_timer"] = vd["DASH_DURATION"] + vd["DASH_COOLDOWN"]
-            vd["player_dash_available"] = False
+    if keys[pygame.K_LSHIFT] and player.dash_available:
+        if player.dash_timer == 0:
+            player.dash_timer = DASH_DURATION + DASH_COOLDOWN
+            player.dash_available = False
 
     # handle wall climbing
-    if not vd["player_on_ground"] and not vd["player_wall_climbing"]:
-        wall_rects = [pygame.Rect(0, 0, 20, vd["WINDOW_HEIGHT"]), pygame.Rect(
-            vd["WINDOW_WIDTH"] - 20, 0, 20, vd["WINDOW_HEIGHT"])]
-        for wall_rect in wall_rects:
-            if vd["player_rect"].colliderect(wall_rect):
+    if not player.on_ground and not player.wall_climbing:
+        for wall_rect in level_grid.query(player.rect):
+            # an earlier wall may have moved the player off this one
+            if player.rect.colliderect(wall_rect):
                 if keys[pygame.K_UP]:
-                    vd["player_wall_climbing"] = True
-                    vd["player_wall_climbing_direction"] = 1 if wall_rect.left == 0 else -1
-                    vd["player_x_velocity"] = 0
-                    vd["player_y_velocity"] = 0
-                    vd["player_wall_climb_timer"] = vd["CLIMB_DURATION"]
-                    vd["player_rect"].left = wall_rect.left - \
-                        (vd["PLAYER_WIDTH"] / 2) * vd["player_wall_climbing_direction"]
-                    vd["player_rect"].bottom = wall_rect.bottom
+                    player.wall_climbing = True
+                    player.wall_climbing_direction = 1 if wall_rect.left == 0 else -1
+                    player.x_velocity = 0
+                    player.y_velocity = 0
+                    player.wall_climb_timer = CLIMB_DURATION
+                    player.x = wall_rect.left - (PLAYER_WIDTH / 2) * player.wall_climbing_direction
+                    player.y = wall_rect.bottom - player.height
 
     # handle wall jump
-    if vd["player_wall_climbing"] and keys[pygame.K_SPACE]:
-        vd["player_y_velocity"] = -vd["JUMP_VELOCITY"]
-        vd["player_x_velocity"] = vd["player_wall_climbing_direction"] * vd["WALK_SPEED"]
-        vd["player_wall_climbing"] = False
-        vd["player_wall_climb_timer"] = 0
+    if player.wall_climbing and keys[pygame.K_SPACE]:
+        player.y_velocity = -JUMP_VELOCITY
+        player.x_velocity = player.wall_climbing_direction * WALK_SPEED
+        player.wall_climbing = False
+        player.wall_climb_timer = 0
+
+
+# advances the game by one fixed physics step
+def step_simulation(entities, player):
+    n = entities.count
+    entities.previous_x[:n] = np.rint(entities.x[:n])
+    entities.previous_y[:n] = np.rint(entities.y[:n])
+
+    # handle timers
+    handle_timers(entities)
+
+    # handle player input
+    player.load()
+    handle_player_input(player)
+    player.save()
+
+    # update entity positions
+    update_entity_positions(entities)
 
 
-def draw_player(vd):
-    if vd["player_on_ground"]:
-        if vd["player_x_velocity"] == 0:
+# draws the player between its last two physics positions, alpha of the way from the previous one
+def draw_player(player, alpha=1.0):
+    player.load()
+    if player.on_ground:
+        if player.x_velocity == 0:
             player_sprite_index = 0
         else:
             player_sprite_index = (pygame.time.get_ticks() // 100) % 2 + 1
-    elif vd["player_wall_climbing"]:
+    elif player.wall_climbing:
         player_sprite_index = 5
-    elif abs(vd["player_x_velocity"]) > 5:
+    elif abs(player.x_velocity) > 5:
         player_sprite_index = 4
     else:
         player_sprite_index = 3
-    player_sprite = player_sprites[player_sprite_index]
-    if vd["player_x_direction"] == -1:
-        player_sprite = pygame.transform.flip(player_sprite, True, False)
-    window.blit(player_sprite, vd["player_rect"])
+    previous_x = player.previous_x
+    previous_y = player.previous_y
+    x = previous_x + (round(player.x) - previous_x) * alpha
+    y = previous_y + (round(player.y) - previous_y) * alpha
+    player_atlas.draw(renderer, player_sprite_index, (round(x), round(y)), player.x_direction == -1)
 
 
-while vd["GAME_RUNNING"]:
+previous_ticks = pygame.time.get_ticks()
+while game_running:
     # handle game timing
-    vd["TIME_DELTA"] = pygame.time.get_ticks() / 1000 - vd["TIME_TOTAL"]
-    vd["TIME_TOTAL"] += vd["TIME_DELTA"]
+    ticks = pygame.time.get_ticks()
+    time_accumulator += (ticks - previous_ticks) / 1000
+    previous_ticks = ticks
 
     # handle events
+    player.load()
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
-            vd["GAME_RUNNING"] = False
+            game_running = False
+
+        # rebuild the sprites at the new resolution
+        if event.type == pygame.WINDOWSIZECHANGED:
+            player_atlas.build(int(window.get_height() / scale))
+            player.width, player.height = player_atlas.frame_size
+            renderer.invalidate()
 
         # handle double jumping
         if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
-            if vd["player_dash_timer"] > 0:
-                if vd["player_double_jump_available"] and not vd["player_on_ground"]:
-                    vd["player_jump_after_dash"] = True
-
-                elif vd["player_on_ground"]:
-                    vd["player_jump_after_dash"] = True
-
-            if vd["player_double_jump_available"] and not vd["player_on_ground"] and vd["player_dash_timer"] == 0:
-                vd["player_y_velocity"] = -vd["JUMP_VELOCITY"]
-                vd["player_jumping"] = True
-                vd["player_double_jump_available"] = False
-                vd["player_jump_after_dash"] = False
-
-    # handle timers
-    handle_timers(vd)
-
-    # handle player input
-    handle_player_input(vd)
-
-    # update player position
-    update_player_position(vd)
-
-    # clear screen
-    window.fill((0, 0, 0))
+            if player.dash_timer > 0:
+                if player.double_jump_available and not player.on_ground:
+                    player.jump_after_dash = True
+
+                elif player.on_ground:
+                    player.jump_after_dash = True
+
+            if player.double_jump_available and not player.on_ground and player.dash_timer == 0:
+                player.y_velocity = -JUMP_VELOCITY
+                player.jumping = True
+                player.double_jump_available = False
+                player.jump_after_dash = False
+    player.save()
+
+    # run as many physics steps as the time since the last frame covers
+    steps = 0
+    while time_accumulator >= TIME_DELTA and steps < MAX_CATCH_UP_STEPS:
+        step_simulation(entities, player)
+        time_accumulator -= TIME_DELTA
+        steps += 1
+
+    # too far behind to catch up, so drop the backlog instead of falling further behind every frame
+    if time_accumulator >= TIME_DELTA:
+        time_accumulator %= TIME_DELTA
+
+    # erase the player from where it was drawn last frame
+    renderer.erase()
 
     # draw player
-    draw_player(vd)
+    draw_player(player, time_accumulator / TIME_DELTA)
 
-    # update screen
-    pygame.display.update()
+    # update the parts of the screen that changed
+    renderer.present()
 
     # set frame rate
-    clock.tick(60)
+    clock.tick(FRAME_RATE)
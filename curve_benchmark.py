@@ -0,0 +1,235 @@
+import argparse
+import datetime
+import importlib.util
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+import curve_math
+
+SCRIPT_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_HISTORY_PATH = os.path.join(SCRIPT_DIRECTORY, "curve_benchmark_history.json")
+
+
+# The plotting code lives in "Downwards curve.py", which has a space in its name,
+# so it has to be loaded from its path
+def load_curve_module():
+    path = os.path.join(SCRIPT_DIRECTORY, "Downwards curve.py")
+    spec = importlib.util.spec_from_file_location("downwards_curve", path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+# Runs func repeatedly and returns the median wall time in seconds.
+# Very fast calls are looped so each timing sample lasts at least min_time.
+def time_call(func, repeat=5, min_time=0.05):
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or loops >= 1_000_000:
+            break
+        loops *= 10
+
+    samples = [elapsed / loops]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        samples.append((time.perf_counter() - start) / loops)
+    return statistics.median(samples)
+
+
+# Peak Python/NumPy memory allocated during a single call, in bytes
+def peak_memory(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+# Builds the list of (name, function, points produced per call) cases to time
+def benchmark_cases(curve, max_points=10**7, batch_sizes=(1, 10, 100, 1000), batch_points=1000):
+    start_point = np.array([0, 0, 0])
+    end_point = np.array([10, 10, 0])
+    height = 65
+    cases = []
+
+    num_points = 10
+    while num_points <= max_points:
+        cases.append((f"bezier_curve[num_points={num_points}]",
+                      lambda n=num_points: curve_math.bezier_curve(start_point, end_point, height, n),
+                      num_points))
+        num_points *= 10
+
+    for batch_size in batch_sizes:
+        end_points = np.random.default_rng(0).random((batch_size, 3)) * 10
+        cases.append((f"bezier_curves[batch={batch_size},num_points={batch_points}]",
+                      lambda e=end_points: curve_math.bezier_curves(start_point, e, height, batch_points),
+                      batch_size * batch_points))
+
+    # Full redraw the way the menu used to do it: clear the axes and rebuild every artist
+    fig = plt.figure()
+    ax = fig.add_subplot(111, projection='3d')
+
+    def full_redraw():
+        ax.clear()
+        curve.set_plot_parameters(start_point, end_point, height, 'o', '^', ax, plt, batch_points)
+
+    cases.append((f"set_plot_parameters[num_points={batch_points}]", full_redraw, batch_points))
+
+    # Incremental redraw through CurvePlot, which only swaps artist data
+    incremental_fig, incremental_ax = curve.create_headless_figure()
+    curve_plot = curve.CurvePlot(incremental_ax, 'o', '^')
+
+    def incremental_redraw():
+        curve_plot.set_data(start_point, end_point, height, batch_points)
+        incremental_fig.canvas.draw()
+
+    cases.append((f"CurvePlot.set_data+draw[num_points={batch_points}]", incremental_redraw, batch_points))
+    return cases
+
+
+# (start_point, end_point, height, tolerance) curves adaptive sampling must stay within tolerance of,
+# including a vertical chord and a steep drop, where the control points overshoot the chord's ends
+ADAPTIVE_CHECK_CASES = [
+    ((0, 0, 0), (10, 10, 0), 65, 0.1),
+    ((0, 0, 0), (0, 0, 10), 65, 0.01),
+    ((0, 0, 0), (1, 0, -100), 65, 1),
+    ((0, 0, 0), (0, 0, -100), 65, 0.5),
+]
+
+
+# Checks that adaptively sampled curves stay within their tolerance of the true curve.
+# Returns the cases that don't, with how far off they are.
+def check_adaptive_sampling(cases=ADAPTIVE_CHECK_CASES):
+    failures = []
+    for start_point, end_point, height, tolerance in cases:
+        curve_points = curve_math.adaptive_bezier_curve(start_point, end_point, height, tolerance)
+        error = curve_math.polyline_error(curve_points, start_point, end_point, height)
+        if error > tolerance:
+            failures.append((start_point, end_point, height, tolerance, error))
+    return failures
+
+
+def run_benchmarks(cases, repeat=5):
+    results = {}
+    for name, func, points in cases:
+        seconds = time_call(func, repeat)
+        results[name] = {
+            "seconds": seconds,
+            "points_per_second": points / seconds,
+            "peak_memory_bytes": peak_memory(func),
+        }
+        print(f"{name:<55} {seconds * 1000:>12.3f} ms {points / seconds:>16,.0f} pts/s "
+              f"{results[name]['peak_memory_bytes'] / 2**20:>10.2f} MiB")
+    return results
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as file:
+        return json.load(file)
+
+
+def save_history(path, history):
+    with open(path, "w") as file:
+        json.dump(history, file, indent=2)
+
+
+# The median time of each case over the last `window` runs in the history. A single noisy
+# or slow run can't move the baseline much, so a slowdown keeps failing until it is fixed.
+def baseline_results(history, window=5):
+    samples = {}
+    for run in history[-window:]:
+        for name, result in run["results"].items():
+            samples.setdefault(name, []).append(result["seconds"])
+    return {name: {"seconds": statistics.median(seconds)} for name, seconds in samples.items()}
+
+
+# Compares a run against the baseline and returns a list of cases that got slower
+# by more than threshold percent
+def find_regressions(results, previous_results, threshold):
+    regressions = []
+    for name, result in results.items():
+        if name not in previous_results:
+            continue
+        previous_seconds = previous_results[name]["seconds"]
+        change = (result["seconds"] - previous_seconds) / previous_seconds * 100
+        if change > threshold:
+            regressions.append((name, previous_seconds, result["seconds"], change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Bezier curve generation and redraws.")
+    parser.add_argument("--history", default=DEFAULT_HISTORY_PATH,
+                        help="JSON file runs are recorded in and compared against")
+    parser.add_argument("--threshold", type=float, default=20.0,
+                        help="fail if a case is more than this many percent slower than the last run (default: 20)")
+    parser.add_argument("--max-points", type=int, default=10**7,
+                        help="largest num_points timed for bezier_curve (default: 10000000)")
+    parser.add_argument("--repeat", type=int, default=5, help="timing samples per case (default: 5)")
+    parser.add_argument("--window", type=int, default=5,
+                        help="compare against the median of this many recent runs (default: 5)")
+    parser.add_argument("--no-save", action="store_true", help="don't append this run to the history file")
+    parser.add_argument("--accept", action="store_true",
+                        help="append this run to the history even if it regressed, making it part of the baseline")
+    args = parser.parse_args()
+
+    # Agg can't open windows, which plt.pause warns about on every redraw
+    warnings.filterwarnings("ignore", message="FigureCanvasAgg is non-interactive", category=UserWarning)
+
+    failures = check_adaptive_sampling()
+    for start_point, end_point, height, tolerance, error in failures:
+        print(f"Adaptive curve {start_point} -> {end_point} (height {height}) is {error:.4g} off, "
+              f"more than its tolerance of {tolerance}")
+    if failures:
+        sys.exit(1)
+
+    curve = load_curve_module()
+    results = run_benchmarks(benchmark_cases(curve, args.max_points), args.repeat)
+
+    history = load_history(args.history)
+    regressions = find_regressions(results, baseline_results(history, args.window), args.threshold)
+
+    # Runs that regressed are only recorded when accepted, so they don't become the new baseline
+    if not args.no_save and (not regressions or args.accept):
+        history.append({
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "matplotlib": matplotlib.__version__,
+            "results": results,
+        })
+        save_history(args.history, history)
+
+    if regressions:
+        print(f"\n{len(regressions)} case(s) regressed by more than {args.threshold}% "
+              f"against the median of the last {args.window} runs:")
+        for name, previous_seconds, seconds, change in regressions:
+            print(f"  {name}: {previous_seconds * 1000:.3f} ms -> {seconds * 1000:.3f} ms ({change:+.1f}%)")
+        if not args.no_save and not args.accept:
+            print("This run was not saved to the history. Run again with --accept if the slowdown is expected.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+import math
+from collections import OrderedDict
+
+import numpy as np
+
+
+# Most memory the cached basis matrices may take up together. Each one is num_points * 4 floats
+# (32 MB per million float64 points), so bases bigger than this are rebuilt on every call instead.
+BASIS_CACHE_BYTES = 64 * 2**20
+
+
+# Bernstein weights for an array of t values, shape (len(t), 4)
+def bernstein_weights(t):
+    mt = 1 - t
+    return np.stack((mt**3, 3 * t * mt**2, 3 * t**2 * mt, t**3), axis=1)
+
+
+# Least recently used bases are evicted once the cache holds more than BASIS_CACHE_BYTES
+_basis_cache = OrderedDict()
+_basis_cache_bytes = 0
+_basis_cache_hits = 0
+_basis_cache_misses = 0
+
+
+# Bernstein basis weights of a cubic Bezier curve, one row of 4 weights per sample.
+# Results are memoized by (num_points, dtype) so only the endpoints have to be recomputed.
+def bernstein_basis(num_points, dtype=np.float64):
+    global _basis_cache_bytes, _basis_cache_hits, _basis_cache_misses
+    key = (int(num_points), np.dtype(dtype))
+    basis = _basis_cache.get(key)
+    if basis is not None:
+        _basis_cache.move_to_end(key)
+        _basis_cache_hits += 1
+        return basis
+
+    _basis_cache_misses += 1
+    basis = bernstein_weights(np.linspace(0, 1, key[0], dtype=key[1]))
+
+    # The same array is handed to every caller, so it must not be modified in place
+    basis.flags.writeable = False
+    if basis.nbytes <= BASIS_CACHE_BYTES:
+        _basis_cache[key] = basis
+        _basis_cache_bytes += basis.nbytes
+        while _basis_cache_bytes > BASIS_CACHE_BYTES:
+            _, evicted = _basis_cache.popitem(last=False)
+            _basis_cache_bytes -= evicted.nbytes
+    return basis
+
+
+# Hit/miss counters and memory use of the basis cache
+def basis_cache_info():
+    return {"hits": _basis_cache_hits, "misses": _basis_cache_misses, "size": len(_basis_cache),
+            "bytes": _basis_cache_bytes, "max_bytes": BASIS_CACHE_BYTES}
+
+
+def clear_basis_cache():
+    global _basis_cache_bytes
+    _basis_cache.clear()
+    _basis_cache_bytes = 0
+
+
+# Control points for a batch of curves as an (n_curves, 4, 3) array.
+# The two inner control points sit a third of the way along the chord, raised by height.
+def control_points(start_points, end_points, heights, dtype=np.float64):
+    start_points = np.atleast_2d(np.asarray(start_points, dtype=dtype))
+    end_points = np.atleast_2d(np.asarray(end_points, dtype=dtype))
+    start_points, end_points = np.broadcast_arrays(start_points, end_points)
+    heights = np.broadcast_to(np.asarray(heights, dtype=dtype), (len(start_points),))
+
+    chord = end_points - start_points
+    p0 = start_points + chord / 3
+    p1 = end_points - chord / 3
+    p0[:, 2] = start_points[:, 2] + heights
+    p1[:, 2] = start_points[:, 2] + heights
+
+    return np.stack((start_points, p0, p1, end_points), axis=1)
+
+
+# Evaluates a whole batch of (start_point, end_point, height) curves in one matrix product.
+# Returns an (n_curves, num_points, 3) array.
+def bezier_curves(start_points, end_points, heights, num_points=50, dtype=np.float64):
+    basis = bernstein_basis(num_points, dtype)
+    controls = control_points(start_points, end_points, heights, dtype)
+
+    # (num_points, 4) @ (n_curves, 4, 3) -> (n_curves, num_points, 3)
+    return basis @ controls
+
+
+# Yields the uniformly sampled curve in (chunk_size, 3) pieces, so the full set of
+# points never has to be held in memory at once. Only the current chunk's basis is built.
+def iter_bezier_chunks(start_point, end_point, height, num_points, chunk_size=1_000_000, dtype=np.float64):
+    num_points = int(num_points)
+    controls = control_points(start_point, end_point, height, dtype)[0]
+
+    # t is always computed in float64, since float32 can't tell apart sample indices past 2**24
+    step = 1 / (num_points - 1) if num_points > 1 else 0
+    for chunk_start in range(0, num_points, chunk_size):
+        chunk_end = min(chunk_start + chunk_size, num_points)
+        t = np.arange(chunk_start, chunk_end, dtype=np.float64) * step
+        if chunk_end == num_points and num_points > 1:
+            t[-1] = 1.0
+        yield bernstein_weights(t).astype(dtype, copy=False) @ controls
+
+
+# Streams the curve straight into a memory-mapped .npy file with bounded RAM
+def save_bezier_curve_npy(path, start_point, end_point, height, num_points, chunk_size=1_000_000, dtype=np.float64):
+    points = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=(int(num_points), 3))
+    offset = 0
+    for chunk in iter_bezier_chunks(start_point, end_point, height, num_points, chunk_size, dtype):
+        points[offset:offset + len(chunk)] = chunk
+        offset += len(chunk)
+    points.flush()
+    del points
+    return path
+
+
+# Splits a cubic's (4, 3) control points at t = 0.5 with de Casteljau
+def split_control_points(controls):
+    p01 = (controls[0] + controls[1]) / 2
+    p12 = (controls[1] + controls[2]) / 2
+    p23 = (controls[2] + controls[3]) / 2
+    p012 = (p01 + p12) / 2
+    p123 = (p12 + p23) / 2
+    mid = (p012 + p123) / 2
+    left = np.array((controls[0], p01, p012, mid))
+    right = np.array((mid, p123, p23, controls[3]))
+    return left, right
+
+
+# How far the inner control points stray from where they would sit on a straight, evenly
+# parameterized chord (a third and two thirds of the way along it). The curve always lies
+# within this distance of the chord segment, including when the control points overshoot its ends.
+def flatness(controls):
+    first = controls[1] - (2 * controls[0] + controls[3]) / 3
+    second = controls[2] - (controls[0] + 2 * controls[3]) / 3
+    return max(np.linalg.norm(first), np.linalg.norm(second))
+
+
+# Samples the curve by subdividing until every segment is within tolerance of its chord,
+# so flat stretches get few points and tight bends get many. Segments stop splitting at max_depth,
+# and a tolerance so small it would take more than max_points points is rejected.
+def adaptive_bezier_curve(start_point, end_point, height, tolerance, max_depth=20, max_points=20_000):
+    if not (tolerance > 0 and math.isfinite(tolerance)):
+        raise ValueError("Tolerance must be a finite number greater than 0")
+
+    controls = control_points(start_point, end_point, height)[0]
+    curve_points = [controls[0]]
+
+    # Segments are pushed right half first so they come off the stack in curve order
+    stack = [(controls, 0)]
+    while stack:
+        segment, depth = stack.pop()
+        if depth >= max_depth or flatness(segment) <= tolerance:
+            curve_points.append(segment[3])
+            continue
+        if len(curve_points) + len(stack) >= max_points:
+            raise ValueError(f"Tolerance {tolerance} needs more than {max_points} curve points, use a larger one")
+        left, right = split_control_points(segment)
+        stack.append((right, depth + 1))
+        stack.append((left, depth + 1))
+
+    return np.array(curve_points)
+
+
+# The furthest any point of the curve (checked at num_samples evenly spaced t values) lies
+# from the polyline through curve_points, for checking adaptive sampling against its tolerance
+def polyline_error(curve_points, start_point, end_point, height, num_samples=10_000):
+    samples = bezier_curves(start_point, end_point, height, num_samples)[0]
+    starts = np.asarray(curve_points[:-1], dtype=np.float64)
+    segments = np.asarray(curve_points[1:], dtype=np.float64) - starts
+
+    errors = np.full(num_samples, np.inf)
+    for segment_start, segment in zip(starts, segments):
+        length_squared = segment @ segment
+        offsets = samples - segment_start
+        t = np.clip(offsets @ segment / length_squared, 0, 1) if length_squared > 0 else np.zeros(num_samples)
+        errors = np.minimum(errors, np.linalg.norm(offsets - t[:, None] * segment, axis=1))
+    return errors.max()
+
+
+# Uniformly samples num_points along the curve, or adaptively when a tolerance is given
+def bezier_curve(start_point, end_point, height, num_points=50, tolerance=None):
+    if tolerance:
+        return adaptive_bezier_curve(start_point, end_point, height, tolerance)
+    return bezier_curves(start_point, end_point, height, num_points)[0]
+
+
+# Cumulative chord lengths along a sampled curve, so positions can be looked up by
+# distance travelled instead of by t. Build it once per curve and query it every frame.
+class ArcLengthTable:
+    def __init__(self, curve_points):
+        self.points = np.asarray(curve_points, dtype=np.float64)
+        if len(self.points) < 2:
+            raise ValueError("An arc length table needs at least 2 curve points")
+
+        segment_lengths = np.linalg.norm(np.diff(self.points, axis=0), axis=1)
+        self.distances = np.concatenate(([0.0], np.cumsum(segment_lengths)))
+        self.length = self.distances[-1]
+
+    @classmethod
+    def from_curve(cls, start_point, end_point, height, num_points=1000, tolerance=None):
+        return cls(bezier_curve(start_point, end_point, height, num_points, tolerance))
+
+    # Positions at any array of distances along the curve, found by binary search and
+    # linear interpolation between neighbouring samples. Distances are clamped to the curve.
+    def points_at_distances(self, distances):
+        distances = np.clip(np.asarray(distances, dtype=np.float64), 0, self.length)
+        segments = np.searchsorted(self.distances, distances, side='right') - 1
+        segments = np.clip(segments, 0, len(self.distances) - 2)
+
+        segment_starts = self.distances[segments]
+        segment_lengths = self.distances[segments + 1] - segment_starts
+        fractions = np.divide(distances - segment_starts, segment_lengths,
+                              out=np.zeros_like(distances), where=segment_lengths > 0)
+
+        return self.points[segments] + fractions[..., None] * (self.points[segments + 1] - self.points[segments])
+
+    def point_at_distance(self, distance):
+        return self.points_at_distances(distance)
+
+    # Resamples the curve so consecutive points are evenly spaced along its length
+    def uniform_points(self, num_points):
+        return self.points_at_distances(np.linspace(0, self.length, int(num_points)))
@@ -0,0 +1,40 @@
+import pygame
+
+
+# Redraws only the parts of the screen that sprites cover, instead of the whole screen every frame.
+# Each frame, erase() paints the background over the last frame's sprites, blit() draws this frame's
+# sprites and remembers where they went, and present() sends just those areas to the display.
+class DirtyRectRenderer:
+    def __init__(self, surface, background=(0, 0, 0)):
+        self.surface = surface
+        self.background = background
+        self.previous_rects = []
+        self.rects = []
+        self.full_redraw = True
+
+    # makes the next frame clear and present the whole screen, e.g. after the window changes size
+    def invalidate(self):
+        self.full_redraw = True
+
+    def erase(self):
+        if self.full_redraw:
+            self.surface.fill(self.background)
+        else:
+            for rect in self.previous_rects:
+                self.surface.fill(self.background, rect)
+
+    # draws like Surface.blit, and marks the area drawn as needing to be presented
+    def blit(self, source, position, area=None):
+        rect = self.surface.blit(source, position, area)
+        self.rects.append(rect)
+        return rect
+
+    # updates the display where sprites were last frame and where they are now
+    def present(self):
+        if self.full_redraw:
+            pygame.display.update()
+            self.full_redraw = False
+        else:
+            pygame.display.update(self.previous_rects + self.rects)
+        self.previous_rects = self.rects
+        self.rects = []